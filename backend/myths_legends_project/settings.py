@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'places.apps.PlacesConfig',
     'users',
     'rest_framework',
@@ -32,7 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'places.middleware.PrometheusMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'places.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,7 +74,7 @@ WSGI_APPLICATION = 'myths_legends_project.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -80,7 +83,9 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'places.api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 100,
 }
 
 DATABASES = {
@@ -99,6 +104,52 @@ DATABASES = {
     }
 }
 
+# Локально и в тестах — locmem; в проде CACHE_URL указывает на общий кэш (например, redis://...).
+# locmem у каждого процесса свой: версии данных, кэш ответов и токенов не видны другим воркерам,
+# поэтому при нескольких воркерах общий CACHE_URL обязателен (при DEBUG = False иначе places.W001)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Сколько секунд кэшировать группы пользователя между запросами (0 — только в рамках запроса)
+ROLES_CACHE_TIMEOUT = env.int('ROLES_CACHE_TIMEOUT', default=300)
+
+# Кэш token -> user для CachedTokenAuthentication; AUTH_TOKEN_EXPIRE_SECONDS = 0 — токены бессрочные
+AUTH_TOKEN_CACHE_TIMEOUT = env.int('AUTH_TOKEN_CACHE_TIMEOUT', default=300)
+AUTH_TOKEN_CACHE_MAX_ENTRIES = env.int('AUTH_TOKEN_CACHE_MAX_ENTRIES', default=10000)
+AUTH_TOKEN_EXPIRE_SECONDS = env.int('AUTH_TOKEN_EXPIRE_SECONDS', default=0)
+
+# Очередь модерации: на сколько секунд модератор получает элементы (продлевается через renew)
+MODERATION_LEASE_SECONDS = env.int('MODERATION_LEASE_SECONDS', default=300)
+
+# Замер SQL/сериализации/рендеринга на каждый запрос: заголовок Server-Timing и лог places.requests.
+# Запросы дольше SLOW_REQUEST_MS миллисекунд пишутся с полным SQL (0 — не выделять медленные).
+# Параметры запросов (ключи токенов, хэши паролей, личные данные) в лог попадают только
+# при SLOW_REQUEST_LOG_PARAMS — включайте его лишь для отладки
+REQUEST_INSTRUMENTATION = env.bool('REQUEST_INSTRUMENTATION', default=False)
+SLOW_REQUEST_MS = env.float('SLOW_REQUEST_MS', default=1000)
+SLOW_REQUEST_LOG_PARAMS = env.bool('SLOW_REQUEST_LOG_PARAMS', default=False)
+
+# Метрики Prometheus на /metrics. Для нескольких воркеров задайте переменную окружения
+# PROMETHEUS_MULTIPROC_DIR (пустой каталог): значения будут суммироваться по процессам
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=False)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'places.requests': {
+            'handlers': ['console'],
+            'level': env('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -131,4 +182,9 @@ CORS_ALLOW_ALL_ORIGINS = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media' 
 
+# Загруженные изображения ждут обработки в локальном spool. IMAGE_INGEST_WORKERS — потоки
+# в процессе веб-сервера; при 0 очередь разбирает только команда process_image_uploads
+IMAGE_SPOOL_DIR = env('IMAGE_SPOOL_DIR', default=str(BASE_DIR / 'spool'))
+IMAGE_INGEST_WORKERS = env.int('IMAGE_INGEST_WORKERS', default=2)
+
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
\ No newline at end of file
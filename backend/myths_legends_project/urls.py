@@ -8,10 +8,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from places.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('places.api.urls')),
     path('api/auth/', include('users.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from django.contrib.gis.admin import OSMGeoAdmin # Используем OSMGeoAdmin для отображения карты
-from .models import Place, UserNote
+from .models import Place, UserNote, Category
 
 # Регистрируем модель Place с использованием OSMGeoAdmin для интерактивной карты
 @admin.register(Place)
@@ -23,4 +23,10 @@ class PlaceAdmin(OSMGeoAdmin):
 class UserNoteAdmin(admin.ModelAdmin):
     list_display = ('place', 'user', 'moderation_status', 'created_at')
     list_filter = ('moderation_status',)
-    search_fields = ('place__name', 'user__username', 'text')
\ No newline at end of file
+    search_fields = ('place__name', 'user__username', 'text')
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
@@ -0,0 +1,89 @@
+# places/api/cache.py
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from places.metrics import observe_response_cache_lookup
+
+PLACES_VERSION_KEY = 'places:version'
+
+
+def get_places_version():
+    """
+    Текущая версия данных о местах; входит в ключи всех производных кэшей.
+    """
+    version = cache.get(PLACES_VERSION_KEY)
+    if version is None:
+        cache.add(PLACES_VERSION_KEY, 1, timeout=None)
+        version = cache.get(PLACES_VERSION_KEY, 1)
+    return version
+
+
+def bump_places_version():
+    """
+    Инвалидирует все производные кэши: старые ключи перестают запрашиваться и вытесняются.
+    """
+    try:
+        cache.incr(PLACES_VERSION_KEY)
+    except ValueError:
+        cache.set(PLACES_VERSION_KEY, 2, timeout=None)
+
+
+# --- Кэш ответов для анонимного просмотра одобренных мест ---
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+
+def response_cache_key(request, action, **kwargs):
+    """
+    Ключ из нормализованных параметров запроса и текущей версии данных:
+    порядок параметров не влияет на попадание в кэш.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = json.dumps([request.get_host(), request.accepted_renderer.format, action, kwargs, params], sort_keys=True)
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'places:response:{get_places_version()}:{digest}'
+
+
+def get_cached_response_data(key):
+    data = cache.get(key)
+    observe_response_cache_lookup(data is not None)
+    return data
+
+
+def set_cached_response_data(key, data):
+    cache.set(key, data, RESPONSE_CACHE_TIMEOUT)
+
+
+# --- Версия активности: счётчики заметок, комментариев и избранного, изображения заметок ---
+# Всё это меняется на порядки чаще самих мест и не входит в тайлы и кластеры, поэтому
+# глобальную версию не трогает. Общая версия активности входит только в ETag, а ответ
+# по одному месту кэшируется с версией этого места. Закэшированные анонимные списки
+# показывают счётчики с отставанием не больше RESPONSE_CACHE_TIMEOUT.
+PLACES_ACTIVITY_VERSION_KEY = 'places:activity:version'
+
+
+def place_activity_key(place_id):
+    return f'places:activity:{place_id}'
+
+
+def get_places_activity_version():
+    return cache.get(PLACES_ACTIVITY_VERSION_KEY, 0)
+
+
+def get_place_activity_version(place_id):
+    return cache.get(place_activity_key(place_id), 0)
+
+
+def bump_places_activity_version(place_ids=()):
+    """
+    Сдвигает общую версию активности и версии мест place_ids. Версия места живёт
+    столько же, сколько закэшированный ответ: после истечения старых ответов уже нет.
+    """
+    cache.add(PLACES_ACTIVITY_VERSION_KEY, 0, timeout=None)
+    try:
+        version = cache.incr(PLACES_ACTIVITY_VERSION_KEY)
+    except ValueError:
+        version = 1
+        cache.set(PLACES_ACTIVITY_VERSION_KEY, version, timeout=None)
+    cache.set_many({place_activity_key(pk): version for pk in place_ids}, RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,125 @@
+# places/api/clusters.py
+import math
+
+from django.core.cache import cache
+from django.db import connection
+
+from .cache import get_places_version
+from .tiles import MAX_ZOOM
+
+# Начиная с этого зума кластеры не строятся, отдаются отдельные точки
+CLUSTER_MAX_ZOOM = 14
+# Сколько ячеек сетки кластеризации приходится на сторону тайла
+CELLS_PER_TILE = 4
+# Защита от слишком большого bbox на крупном зуме
+MAX_TILES_PER_REQUEST = 64
+CLUSTERS_CACHE_TIMEOUT = 60 * 10
+
+# Тайл сравнивается с точками как геометрия (см. TILE_SQL в tiles.py)
+CLUSTERS_SQL = """
+    SELECT
+        count(*) AS point_count,
+        ST_X(ST_Centroid(ST_Collect(p.location::geometry))) AS lon,
+        ST_Y(ST_Centroid(ST_Collect(p.location::geometry))) AS lat,
+        min(p.id) AS id,
+        min(p.name) AS name
+    FROM places_place p
+    WHERE p.status = %(status)s
+      AND p.location::geometry(Geometry, 4326) && ST_MakeEnvelope(%(west)s, %(south)s, %(east)s, %(north)s, 4326)
+    GROUP BY ST_SnapToGrid(p.location::geometry, %(cell)s)
+"""
+
+POINTS_SQL = """
+    SELECT 1 AS point_count, ST_X(p.location::geometry), ST_Y(p.location::geometry), p.id, p.name
+    FROM places_place p
+    WHERE p.status = %(status)s
+      AND p.location::geometry(Geometry, 4326) && ST_MakeEnvelope(%(west)s, %(south)s, %(east)s, %(north)s, 4326)
+"""
+
+
+def parse_bbox(value):
+    """
+    Разбирает bbox вида 'west,south,east,north' в градусах. Бросает ValueError.
+    """
+    west, south, east, north = (float(v) for v in value.split(','))
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError('Invalid bbox')
+    return west, south, east, north
+
+
+def _lon_to_tile_x(lon, n):
+    return min(n - 1, max(0, int((lon + 180) / 360 * n)))
+
+
+def _lat_to_tile_y(lat, n):
+    lat = max(min(lat, 85.0511), -85.0511)
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return min(n - 1, max(0, int(y)))
+
+
+def _tile_bounds(z, x, y):
+    n = 2 ** z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def bbox_tile_ranges(bbox, zoom):
+    """
+    Диапазоны x и y тайлов зума zoom, покрывающих bbox. Кэш строится по тайлам, чтобы при
+    панорамировании ключи повторялись независимо от точных границ экрана.
+    """
+    west, south, east, north = bbox
+    n = 2 ** zoom
+    xs = range(_lon_to_tile_x(west, n), _lon_to_tile_x(east, n) + 1)
+    ys = range(_lat_to_tile_y(north, n), _lat_to_tile_y(south, n) + 1)
+    return xs, ys
+
+
+def _tile_features(z, x, y, status):
+    key = f'places:clusters:{get_places_version()}:{status}:{z}:{x}:{y}'
+    features = cache.get(key)
+    if features is not None:
+        return features
+
+    west, south, east, north = _tile_bounds(z, x, y)
+    params = {
+        'status': status, 'west': west, 'south': south, 'east': east, 'north': north,
+        'cell': 360 / 2 ** z / CELLS_PER_TILE,
+    }
+    sql = CLUSTERS_SQL if z <= CLUSTER_MAX_ZOOM else POINTS_SQL
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    features = []
+    for point_count, lon, lat, place_id, name in rows:
+        properties = {'cluster': point_count > 1, 'point_count': point_count}
+        if point_count == 1:
+            properties.update({'id': place_id, 'name': name})
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': properties,
+        })
+    cache.set(key, features, CLUSTERS_CACHE_TIMEOUT)
+    return features
+
+
+def get_clusters(bbox, zoom, status):
+    """
+    FeatureCollection с кластерами (или отдельными точками на крупном зуме) внутри bbox.
+    """
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f"'zoom' must be between 0 and {MAX_ZOOM}.")
+    # Число тайлов проверяется по диапазонам, до построения списка
+    xs, ys = bbox_tile_ranges(bbox, zoom)
+    if len(xs) * len(ys) > MAX_TILES_PER_REQUEST:
+        raise ValueError('Bbox is too large for this zoom level')
+    features = []
+    for x in xs:
+        for y in ys:
+            features.extend(_tile_features(zoom, x, y, status))
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,94 @@
+# places/api/conditional.py
+import hashlib
+import json
+
+from django.db.models import Count, Max
+from django.utils.cache import parse_etags, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified для list и retrieve. Валидаторы считаются одним агрегатом
+    (max(updated_at), count) по отфильтрованному queryset, без сериализации тела,
+    поэтому при совпадении If-None-Match ответ 304 отдаётся до сериализатора.
+    """
+    etag_timestamp_field = 'updated_at'
+    # If-Modified-Since учитывается только для retrieve и только если
+    # любое изменение ответа сдвигает etag_timestamp_field
+    use_if_modified_since = True
+
+    def get_etag_extra(self):
+        """
+        Дополнительные части ETag (версия данных, пользователь и т.п.).
+        """
+        return []
+
+    def make_etag(self, *parts):
+        params = sorted((key, sorted(values)) for key, values in self.request.query_params.lists())
+        raw = json.dumps(
+            [self.action, self.request.accepted_renderer.format, params, self.get_etag_extra(), *parts],
+            default=str,
+        )
+        return quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+    def get_list_validators(self, queryset):
+        model = queryset.model
+        stats = model.objects.filter(pk__in=queryset.order_by().values('pk')).aggregate(
+            last_modified=Max(self.etag_timestamp_field), count=Count('pk'),
+        )
+        last_modified = stats['last_modified']
+        etag = self.make_etag(last_modified, stats['count'])
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def get_object_validators(self, instance):
+        last_modified = getattr(instance, self.etag_timestamp_field, None)
+        etag = self.make_etag(instance.pk, last_modified)
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def is_not_modified(self, etag, last_modified, use_modified_since=False):
+        if_none_match = self.request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+        # Для списков If-Modified-Since ненадёжен: удаление строки не сдвигает max(updated_at)
+        if use_modified_since and last_modified is not None:
+            if_modified_since = parse_http_date_safe(self.request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+            return if_modified_since is not None and last_modified <= if_modified_since
+        return False
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def not_modified_response(self, etag, last_modified):
+        return self.set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.get_list_validators(queryset)
+        if self.is_not_modified(etag, last_modified):
+            return self.not_modified_response(etag, last_modified)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        return self.set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_object_validators(instance)
+        if self.is_not_modified(etag, last_modified, use_modified_since=self.use_if_modified_since):
+            return self.not_modified_response(etag, last_modified)
+
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), etag, last_modified)
@@ -0,0 +1,160 @@
+# places/api/geo.py
+import base64
+import json
+
+from django.contrib.gis.db.models import GeometryField, LineStringField, PointField
+from django.contrib.gis.geos import GEOSException, GEOSGeometry
+from django.db import connection
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.functions import Cast
+
+MAX_KNN_LIMIT = 100
+MAX_BATCH_ORIGINS = 500
+
+# Коридор вдоль маршрута
+MAX_ROUTE_POINTS = 20000
+# Маршруты длиннее упрощаются перед запросом: ST_DWithin по линии из тысяч точек дорогой
+ROUTE_SIMPLIFY_POINTS = 500
+MAX_CORRIDOR_BUFFER_M = 5000
+METERS_PER_DEGREE = 111320
+
+# Все точки разом: для каждой строки origins LATERAL-подзапрос делает KNN-поиск по
+# GiST-индексу (<->), точное расстояние считается только для её K мест
+BATCH_KNN_SQL = """
+    WITH origins AS (
+        SELECT o.idx, o.k, o.radius,
+               ST_SetSRID(ST_MakePoint(o.lon, o.lat), 4326)::geography AS geog
+        FROM unnest(%(idx)s::integer[], %(lon)s::float8[], %(lat)s::float8[],
+                    %(k)s::integer[], %(radius)s::float8[]) AS o(idx, lon, lat, k, radius)
+    )
+    SELECT o.idx, nearest.id, nearest.distance
+    FROM origins o
+    CROSS JOIN LATERAL (
+        SELECT p.id, ST_Distance(p.location, o.geog) AS distance
+        FROM places_place p
+        WHERE p.status = 'approved'
+          AND (o.radius IS NULL OR ST_DWithin(p.location, o.geog, o.radius))
+        ORDER BY p.location <-> o.geog, p.id
+        LIMIT o.k
+    ) AS nearest
+    ORDER BY o.idx, nearest.distance, nearest.id
+"""
+
+
+class KNNDistance(Func):
+    """
+    location <-> точка: расстояние по сфере (в метрах), которое PostGIS умеет
+    отдавать в порядке возрастания прямо из GiST-индекса. Подходит для ORDER BY ... LIMIT K;
+    точное расстояние (Distance) при этом считается только для K возвращённых строк.
+    """
+    arg_joiner = ' <-> '
+    template = '(%(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, field, point, **extra):
+        point_value = Value(point, output_field=PointField(srid=4326, geography=True))
+        super().__init__(F(field), point_value, **extra)
+
+
+def encode_knn_cursor(distance, pk):
+    raw = json.dumps([distance, pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_knn_cursor(cursor):
+    """
+    Позиция (knn-расстояние, id) последней выданной строки. ValueError при неверном курсоре.
+    """
+    try:
+        distance, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(distance), int(pk)
+    except (TypeError, ValueError, UnicodeError, json.JSONDecodeError):
+        raise ValueError('Invalid cursor.')
+
+
+def parse_origins(data, default_k=10, default_radius_km=None):
+    """
+    Проверяет список точек [{"lat", "lon", "k"?, "radius_km"?}, ...].
+    Возвращает [(lat, lon, k, radius_m)], при ошибке — ValueError с номером точки.
+    """
+    if not isinstance(data, list) or not data or len(data) > MAX_BATCH_ORIGINS:
+        raise ValueError(f"'origins' must be a non-empty list of at most {MAX_BATCH_ORIGINS} points.")
+    origins = []
+    for index, origin in enumerate(data):
+        try:
+            lat = float(origin['lat'])
+            lon = float(origin['lon'])
+            k = int(origin.get('k', default_k))
+            radius_km = origin.get('radius_km', default_radius_km)
+            radius_m = float(radius_km) * 1000 if radius_km not in (None, '') else None
+        except (TypeError, KeyError, ValueError, AttributeError):
+            raise ValueError(f'Invalid origin #{index}.')
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and 1 <= k <= MAX_KNN_LIMIT) or (radius_m is not None and radius_m <= 0):
+            raise ValueError(f'Invalid origin #{index}.')
+        origins.append((lat, lon, k, radius_m))
+    return origins
+
+
+def batch_nearest(origins):
+    """
+    K ближайших одобренных мест для каждой точки одним запросом.
+    Возвращает список (для каждой точки) списков (place_id, расстояние в метрах).
+    """
+    params = {
+        'idx': list(range(len(origins))),
+        'lat': [o[0] for o in origins],
+        'lon': [o[1] for o in origins],
+        'k': [o[2] for o in origins],
+        'radius': [o[3] for o in origins],
+    }
+    results = [[] for _ in origins]
+    with connection.cursor() as cursor:
+        cursor.execute(BATCH_KNN_SQL, params)
+        for idx, place_id, distance in cursor.fetchall():
+            results[idx].append((place_id, distance))
+    return results
+
+
+class LineLocatePoint(Func):
+    """
+    Доля длины маршрута (0..1) до ближайшей к месту точки линии, для сортировки вдоль маршрута.
+    """
+    function = 'ST_LineLocatePoint'
+    output_field = FloatField()
+
+    def __init__(self, line, field, **extra):
+        super().__init__(
+            Value(line, output_field=LineStringField(srid=4326)),
+            Cast(field, GeometryField(srid=4326)),
+            **extra,
+        )
+
+
+def parse_route(data):
+    """
+    GeoJSON LineString (геометрия или Feature) в GEOSGeometry с SRID 4326. ValueError при ошибке.
+    """
+    if isinstance(data, dict) and data.get('type') == 'Feature':
+        data = data.get('geometry')
+    if not isinstance(data, dict) or data.get('type') != 'LineString':
+        raise ValueError("'route' must be a GeoJSON LineString.")
+    try:
+        line = GEOSGeometry(json.dumps(data), srid=4326)
+    except (GEOSException, ValueError, TypeError):
+        raise ValueError("'route' must be a GeoJSON LineString.")
+    if line.num_points < 2 or line.num_points > MAX_ROUTE_POINTS or not line.valid:
+        raise ValueError(f"'route' must have between 2 and {MAX_ROUTE_POINTS} points.")
+    return line
+
+
+def simplify_route(line, buffer_m):
+    """
+    Упрощает длинный маршрут с допуском в четверть ширины коридора.
+    Возвращает (линия, допуск в метрах), на который нужно расширить поиск.
+    """
+    if line.num_points <= ROUTE_SIMPLIFY_POINTS:
+        return line, 0
+    tolerance_m = buffer_m / 4
+    simplified = line.simplify(tolerance_m / METERS_PER_DEGREE, preserve_topology=True)
+    simplified.srid = 4326
+    return simplified, tolerance_m
@@ -0,0 +1,257 @@
+# places/api/moderation.py
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from places.api.cache import bump_places_version
+from places.models import Place, UserNote, Comment
+from places.signals import apply_place_counter_deltas
+from .permissions import IsModeratorOrAdmin
+
+MAX_BULK_IDS = 5000
+MAX_CLAIM_BATCH = 50
+MAX_LEASE_SECONDS = 3600
+
+# Действия модерации, для всех нужны IsAdminUser + IsModeratorOrAdmin
+MODERATION_ACTIONS = [
+    'approve', 'reject', 'bulk_approve', 'bulk_reject',
+    'queue_claim', 'queue_renew', 'queue_release', 'queue_stats',
+]
+
+# Очереди модерации: модель и поле статуса
+MODERATION_QUEUES = {
+    'places': (Place, 'status'),
+    'notes': (UserNote, 'moderation_status'),
+    'comments': (Comment, 'moderation_status'),
+}
+
+# Один UPDATE на всю пачку; CTE блокирует подходящие строки и отдаёт их прежний статус,
+# чтобы поправить счётчики мест без повторного чтения
+BULK_MODERATION_SQL = """
+    WITH matched AS (
+        SELECT id, {status} AS old_status, {place_column}
+        FROM {table}
+        WHERE id = ANY(%(ids)s) AND {status} = ANY(%(from_status)s)
+        FOR UPDATE
+    )
+    UPDATE {table} AS t
+    SET {status} = %(new_status)s, {set_reason} claimed_by_id = NULL, claim_expires_at = NULL, updated_at = now()
+    FROM matched
+    WHERE t.id = matched.id
+    RETURNING t.id, matched.old_status, matched.place_id
+"""
+
+
+def _free_q(user=None, now=None):
+    """
+    Элемент свободен, если аренды нет или она истекла (истёкшие аренды освобождаются сами).
+    """
+    now = now or timezone.now()
+    q = Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lte=now)
+    if user is not None:
+        q |= Q(claimed_by=user)
+    return q
+
+
+def get_queue_stats(model, status_field):
+    """
+    Глубина очереди и возраст самых старых элементов одним агрегатом.
+    """
+    now = timezone.now()
+    stats = model.objects.filter(**{status_field: 'pending'}).aggregate(
+        depth=Count('pk'),
+        claimed=Count('pk', filter=Q(claim_expires_at__gt=now)),
+        oldest=Min('created_at'),
+        oldest_available=Min('created_at', filter=_free_q(now=now)),
+    )
+    return {
+        'depth': stats['depth'],
+        'claimed': stats['claimed'],
+        'available': stats['depth'] - stats['claimed'],
+        'oldest_age_seconds': int((now - stats['oldest']).total_seconds()) if stats['oldest'] else None,
+        'oldest_available_age_seconds': (
+            int((now - stats['oldest_available']).total_seconds()) if stats['oldest_available'] else None
+        ),
+    }
+
+
+class ModerationMixin:
+    """
+    Массовая модерация и очередь с арендой.
+
+    bulk_approve / bulk_reject: POST {"ids": [...], "rejection_reason": "...", "from_status": ["pending"]}.
+    Статус меняется одним UPDATE ... WHERE id = ANY(...) AND status = ANY(from_status),
+    ответ содержит результат по каждому id: новый статус, 'not_found' или 'skipped'.
+
+    queue/claim выдаёт модератору пачку самых старых pending-элементов
+    (SELECT ... FOR UPDATE SKIP LOCKED); другие модераторы их не получат, пока аренда
+    не истечёт, не будет отпущена (queue/release) или элемент не будет одобрен/отклонён.
+    queue/renew продлевает аренду, queue/stats — глубина и возраст очереди.
+    """
+    moderation_status_field = 'moderation_status'
+    # Поле Place со счётчиком одобренных объектов (None — счётчика нет)
+    moderation_counter_field = None
+
+    def _bulk_moderate(self, request, new_status):
+        model = self.queryset.model
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids or len(ids) > MAX_BULK_IDS:
+            return Response(
+                {"detail": f"'ids' must be a non-empty list of at most {MAX_BULK_IDS} ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid value in 'ids'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid_statuses = dict(model._meta.get_field(self.moderation_status_field).choices)
+        from_status = request.data.get('from_status', ['pending'])
+        if isinstance(from_status, str):
+            from_status = [from_status]
+        if not from_status or any(value not in valid_statuses for value in from_status):
+            return Response({"detail": "Invalid value for 'from_status'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        quote = connection.ops.quote_name
+        params = {'ids': ids, 'from_status': list(from_status), 'new_status': new_status}
+        set_reason = ''
+        if new_status == 'rejected':
+            set_reason = 'rejection_reason = %(reason)s,'
+            params['reason'] = request.data.get('rejection_reason', '')
+        sql = BULK_MODERATION_SQL.format(
+            table=quote(model._meta.db_table),
+            status=quote(model._meta.get_field(self.moderation_status_field).column),
+            place_column='place_id' if self.moderation_counter_field else 'NULL::bigint AS place_id',
+            set_reason=set_reason,
+        )
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                updated = cursor.fetchall()
+            if self.moderation_counter_field:
+                self._update_counters(updated, new_status)
+
+        updated_ids = {row[0] for row in updated}
+        # Второй запрос только для тех id, что не подошли, чтобы объяснить причину
+        current = dict(
+            model.objects.filter(pk__in=[pk for pk in ids if pk not in updated_ids])
+            .values_list('pk', self.moderation_status_field)
+        )
+        results = []
+        for pk in ids:
+            if pk in updated_ids:
+                results.append({'id': pk, 'result': new_status})
+            elif pk in current:
+                results.append({'id': pk, 'result': 'skipped', 'status': current[pk]})
+            else:
+                results.append({'id': pk, 'result': 'not_found'})
+
+        if updated and model is Place:
+            # UPDATE не шлёт post_save, закэшированные ответы сбрасываем сами.
+            # Модерация заметок и комментариев меняет у мест только счётчики
+            bump_places_version()
+        return Response({'updated': len(updated_ids), 'results': results}, status=status.HTTP_200_OK)
+
+    def _update_counters(self, updated, new_status):
+        deltas = Counter()
+        for _, old_status, place_id in updated:
+            if new_status == 'approved' and old_status != 'approved':
+                deltas[place_id] += 1
+            elif new_status != 'approved' and old_status == 'approved':
+                deltas[place_id] -= 1
+        apply_place_counter_deltas(self.moderation_counter_field, deltas)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser, IsModeratorOrAdmin])
+    def bulk_approve(self, request):
+        return self._bulk_moderate(request, 'approved')
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser, IsModeratorOrAdmin])
+    def bulk_reject(self, request):
+        return self._bulk_moderate(request, 'rejected')
+
+    def _parse_ids(self, request):
+        ids = request.data.get('ids')
+        if ids is None:
+            return None
+        if not isinstance(ids, list) or len(ids) > MAX_BULK_IDS:
+            raise ValueError
+        return [int(pk) for pk in ids]
+
+    def _lease_seconds(self, request):
+        lease = int(request.data.get('lease_seconds', settings.MODERATION_LEASE_SECONDS))
+        return min(max(lease, 1), MAX_LEASE_SECONDS)
+
+    def _lease_response(self, ids, expires_at):
+        items = self.get_queryset().filter(pk__in=ids).order_by('created_at', 'id')
+        serializer = self.get_serializer(items, many=True)
+        return Response({'lease_expires_at': expires_at if ids else None, 'results': serializer.data})
+
+    @action(detail=False, methods=['post'], url_path='queue/claim', permission_classes=[IsAdminUser, IsModeratorOrAdmin])
+    def queue_claim(self, request):
+        model = self.queryset.model
+        try:
+            limit = min(max(int(request.data.get('limit', 10)), 1), MAX_CLAIM_BATCH)
+            lease = self._lease_seconds(request)
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid value for 'limit' or 'lease_seconds'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=lease)
+        with transaction.atomic():
+            # Уже взятые этим модератором элементы возвращаются повторно (и продлеваются)
+            ids = list(
+                model.objects.filter(**{self.moderation_status_field: 'pending'})
+                .filter(_free_q(request.user, now))
+                .order_by('created_at', 'id')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:limit]
+            )
+            model.objects.filter(pk__in=ids).update(claimed_by=request.user, claim_expires_at=expires_at)
+        return self._lease_response(ids, expires_at)
+
+    @action(detail=False, methods=['post'], url_path='queue/renew', permission_classes=[IsAdminUser, IsModeratorOrAdmin])
+    def queue_renew(self, request):
+        model = self.queryset.model
+        try:
+            ids = self._parse_ids(request)
+            lease = self._lease_seconds(request)
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid value for 'ids' or 'lease_seconds'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=lease)
+        # Продлить можно только свою ещё не истёкшую аренду
+        held = model.objects.filter(claimed_by=request.user, claim_expires_at__gt=now)
+        if ids is not None:
+            held = held.filter(pk__in=ids)
+        with transaction.atomic():
+            renewed = list(held.select_for_update().values_list('pk', flat=True))
+            model.objects.filter(pk__in=renewed).update(claim_expires_at=expires_at)
+        return Response({'lease_expires_at': expires_at if renewed else None, 'renewed': renewed})
+
+    @action(detail=False, methods=['post'], url_path='queue/release', permission_classes=[IsAdminUser, IsModeratorOrAdmin])
+    def queue_release(self, request):
+        model = self.queryset.model
+        try:
+            ids = self._parse_ids(request)
+        except (TypeError, ValueError):
+            return Response({"detail": "Invalid value for 'ids'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        held = model.objects.filter(claimed_by=request.user)
+        if ids is not None:
+            held = held.filter(pk__in=ids)
+        released = held.update(claimed_by=None, claim_expires_at=None)
+        return Response({'released': released})
+
+    @action(detail=False, methods=['get'], url_path='queue/stats', permission_classes=[IsAdminUser, IsModeratorOrAdmin])
+    def queue_stats(self, request):
+        return Response(get_queue_stats(self.queryset.model, self.moderation_status_field))
@@ -0,0 +1,57 @@
+# places/api/pagination.py
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация по стабильному ключу (created_at, id).
+    Размер страницы можно задать через ?page_size=, но не больше max_page_size.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Добавляем id как завершающий ключ, чтобы порядок был однозначным
+        # и совпадал с составными индексами (<поле>, id).
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            tiebreaker = '-id' if ordering[0].startswith('-') else 'id'
+            ordering = ordering + (tiebreaker,)
+        return ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        field_name = ordering[0].lstrip('-')
+        attr = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+        # Аннотация Distance возвращает объект measure, в курсор кладём метры
+        if hasattr(attr, 'm'):
+            return str(attr.m)
+        return str(attr)
+
+
+class GeoJsonCursorPagination(KeysetCursorPagination):
+    """
+    Курсорная пагинация для GeoFeatureModelSerializer: ответ остаётся FeatureCollection.
+    """
+    ordering = ('name', 'id')
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('type', 'FeatureCollection'),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('features', data['features']),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        paginated_schema = super().get_paginated_response_schema(schema)
+        paginated_schema['properties']['features'] = paginated_schema['properties'].pop('results')
+        paginated_schema['properties'] = {
+            'type': {'type': 'string', 'enum': ['FeatureCollection']},
+            **paginated_schema['properties'],
+        }
+        return paginated_schema
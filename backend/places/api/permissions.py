@@ -1,5 +1,6 @@
 # places/api/permissions.py
 from rest_framework import permissions
+from places.roles import is_moderator
 
 class IsOwnerOrAdminOrReadOnly(permissions.BasePermission):
     """
@@ -26,7 +27,8 @@ class IsModeratorOrAdmin(permissions.BasePermission):
     Custom permission to only allow users in 'Moderators' group or superusers.
     """
     def has_permission(self, request, view):
-        return request.user and (request.user.is_superuser or request.user.groups.filter(name='Moderators').exists())
+        # Роли вычисляются один раз за запрос, см. places/roles.py
+        return is_moderator(request.user)
 
     def has_object_permission(self, request, view, obj):
         # Optionally, you can add object-level permission here if needed,
@@ -3,7 +3,9 @@
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
 from places.models import Place, UserNote, Comment, PlaceImage, NoteImage
+from places.filters import render_search_headline
 from django.db.models import Avg, Count, F, Q
 from django.contrib.gis.geos import Point # Импорт для работы с географическими точками
 import json # Импорт для парсинга JSON-строк
@@ -23,14 +25,39 @@ class UserSerializer(serializers.ModelSerializer):
         """Возвращает список названий групп, к которым принадлежит пользователь."""
         return [group.name for group in obj.groups.all()]
 
+def build_image_variants(variants, request):
+    """
+    Карта вариантов изображения для srcset:
+    {'original': {'width', 'height'}, 'thumb': {'width', 'height', 'webp': url, 'jpeg': url}, ...}.
+    """
+    if not variants or 'error' in variants:
+        return {}
+    result = {}
+    for name, entry in variants.items():
+        if not isinstance(entry, dict):
+            continue
+        data = {}
+        for key, value in entry.items():
+            if key in ('width', 'height'):
+                data[key] = value
+            else:
+                url = default_storage.url(value)
+                data[key] = request.build_absolute_uri(url) if request is not None else url
+        result[name] = data
+    return result
+
 # --- Сначала сериализаторы изображений ---
 class PlaceImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = PlaceImage
-        fields = ['id', 'image', 'image_url', 'uploaded_at']
-        read_only_fields = ['id', 'image_url', 'uploaded_at']
+        fields = ['id', 'image', 'image_url', 'image_variants', 'processing_status', 'processing_error', 'uploaded_at']
+        read_only_fields = ['id', 'image_url', 'image_variants', 'processing_status', 'processing_error', 'uploaded_at']
+
+    def get_image_variants(self, obj):
+        return build_image_variants(obj.image_variants, self.context.get('request'))
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -43,11 +70,15 @@ class PlaceImageSerializer(serializers.ModelSerializer):
 
 class NoteImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = NoteImage
-        fields = ['id', 'image', 'image_url', 'uploaded_at']
-        read_only_fields = ['id', 'image_url', 'uploaded_at']
+        fields = ['id', 'image', 'image_url', 'image_variants', 'processing_status', 'processing_error', 'uploaded_at']
+        read_only_fields = ['id', 'image_url', 'image_variants', 'processing_status', 'processing_error', 'uploaded_at']
+
+    def get_image_variants(self, obj):
+        return build_image_variants(obj.image_variants, self.context.get('request'))
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -69,12 +100,16 @@ class UserNoteSerializer(serializers.ModelSerializer):
     rejection_reason = serializers.CharField(required=False, allow_null=True, allow_blank=True)
     image = serializers.ImageField(required=False, allow_null=True)
     images = NoteImageSerializer(many=True, read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = UserNote
-        fields = ['id', 'place', 'user', 'author_username', 'text', 'image', 'images', 'moderation_status', 'created_at', 'updated_at', 'rejection_reason']
+        fields = ['id', 'place', 'user', 'author_username', 'text', 'image', 'image_variants', 'images', 'moderation_status', 'created_at', 'updated_at', 'rejection_reason']
         read_only_fields = ['user', 'moderation_status', 'created_at', 'updated_at'] # Поля только для чтения
 
+    def get_image_variants(self, obj):
+        return build_image_variants(obj.image_variants, self.context.get('request'))
+
     def get_image(self, obj):
         request = self.context.get('request')
         if obj.image and hasattr(obj.image, 'url'):
@@ -100,27 +135,31 @@ class CommentSerializer(serializers.ModelSerializer):
 
 class PlaceSerializer(GeoFeatureModelSerializer):
     distance = serializers.SerializerMethodField()
-    notes_count = serializers.SerializerMethodField()
+    notes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
     current_user_note = serializers.SerializerMethodField()
     owner = UserSerializer(read_only=True)
     image = serializers.ImageField(required=False, allow_null=True)
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     rejection_reason = serializers.CharField(required=False, allow_null=True, allow_blank=True)
     is_favorite = serializers.SerializerMethodField()
-    favorites_count = serializers.SerializerMethodField()
+    favorites_count = serializers.IntegerField(read_only=True)
     images = PlaceImageSerializer(many=True, read_only=True)
+    search_headline = serializers.SerializerMethodField()
 
     class Meta:
         model = Place
         geo_field = "location"
         fields = [
             "id", "name", "description", "location", "categories", "status",
-            "created_at", "updated_at", "image", "image_url", "distance",
+            "created_at", "updated_at", "image", "image_url", "image_variants", "distance",
             "notes_count", "current_user_note", "owner", "rejection_reason",
-            "is_favorite", "favorites_count", "images"
+            "is_favorite", "favorites_count", "comments_count", "last_activity_at", "images", "search_headline"
         ]
         read_only_fields = [
-            'created_at', 'updated_at', 'status', 'notes_count', 'current_user_note', 'is_favorite', 'favorites_count', 'image_url'
+            'created_at', 'updated_at', 'status', 'notes_count', 'current_user_note', 'is_favorite', 'favorites_count', 'image_url',
+            'image_variants', 'comments_count', 'last_activity_at', 'search_headline'
         ]
 
     # to_internal_value остается таким же, чтобы парсить входящие строки 'geometry' и 'properties'
@@ -187,22 +226,24 @@ class PlaceSerializer(GeoFeatureModelSerializer):
 
         return super().update(instance, validated_data)
 
+    # Значения ниже аннотируются в PlaceViewSet.annotate_queryset; запросы к БД
+    # выполняются только для экземпляров, полученных в обход viewset (например, после create).
+    # Счётчики notes_count/favorites_count/comments_count хранятся в самой модели Place.
+
     def get_distance(self, obj):
         """
-        Рассчитывает и возвращает расстояние от объекта до местоположения пользователя.
+        Возвращает расстояние от объекта до местоположения пользователя в метрах.
         """
-        user_location = self.context.get('user_location')
-        if user_location and obj.location:
-            dist = getattr(obj, 'distance', None) # Получаем атрибут distance, если он был аннотирован
-            if dist is not None:
-                return round(dist.m, 2) # Возвращаем расстояние в метрах, округленное до 2 знаков
+        dist = getattr(obj, 'distance', None) # Получаем атрибут distance, если он был аннотирован
+        if dist is not None and hasattr(dist, 'm'):
+            return round(dist.m, 2) # Возвращаем расстояние в метрах, округленное до 2 знаков
         return None
 
-    def get_notes_count(self, obj):
+    def get_search_headline(self, obj):
         """
-        Возвращает количество одобренных заметок для данного места.
+        Фрагмент описания с подсвеченными совпадениями (только при ?search=).
         """
-        return obj.user_notes.filter(moderation_status='approved').count()
+        return render_search_headline(getattr(obj, 'search_headline', None))
 
     def get_current_user_note(self, obj):
         """
@@ -210,7 +251,9 @@ class PlaceSerializer(GeoFeatureModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            notes = obj.user_notes.filter(user=request.user)
+            notes = getattr(obj, 'current_user_notes', None)
+            if notes is None:
+                notes = obj.user_notes.filter(user=request.user)
             return UserNoteSerializer(notes, many=True, context={'request': request}).data
         return []
 
@@ -223,11 +266,13 @@ class PlaceSerializer(GeoFeatureModelSerializer):
             return url
         return None
 
+    def get_image_variants(self, obj):
+        return build_image_variants(obj.image_variants, self.context.get('request'))
+
     def get_is_favorite(self, obj):
+        if hasattr(obj, 'is_favorite'):
+            return obj.is_favorite
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.favorites.filter(id=request.user.id).exists()
         return False
-
-    def get_favorites_count(self, obj):
-        return obj.favorites.count()
\ No newline at end of file
@@ -0,0 +1,49 @@
+# places/api/tiles.py
+from functools import lru_cache
+
+from django.db import connection
+
+from .cache import get_places_version
+
+TILE_CACHE_SIZE = 1024
+MAX_ZOOM = 22
+
+# Тайл строится целиком в PostGIS: точки переводятся в Web Mercator и обрезаются
+# по границам тайла. В атрибуты попадают только id, name и первая категория.
+# Отбор — по геометрии (индекс place_location_geom_idx): как geography конверт тайла
+# на z0/z1 охватывает полмира и больше, а рёбра по дугам большого круга делают его вырожденным.
+TILE_SQL = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom
+    ),
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(p.location::geometry, 3857), bounds.geom) AS geom,
+            p.id,
+            p.name,
+            trim(split_part(coalesce(p.categories, ''), ',', 1)) AS category
+        FROM places_place p, bounds
+        WHERE p.status = 'approved'
+          AND p.location::geometry(Geometry, 4326) && ST_Transform(bounds.geom, 4326)
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'places', 4096, 'geom') FROM mvtgeom
+"""
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+@lru_cache(maxsize=TILE_CACHE_SIZE)
+def _render_tile(version, z, x, y):
+    with connection.cursor() as cursor:
+        cursor.execute(TILE_SQL, {'z': z, 'x': x, 'y': y})
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] is not None else b''
+
+
+def get_place_tile(z, x, y):
+    """
+    Возвращает MVT-тайл с одобренными местами для z/x/y.
+    """
+    return _render_tile(get_places_version(), z, x, y)
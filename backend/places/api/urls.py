@@ -1,5 +1,6 @@
 # backend/places/api/urls.py
 
+from django.urls import re_path
 from rest_framework.routers import DefaultRouter
 from .viewsets import PlaceViewSet, UserNoteViewSet, CommentViewSet
 
@@ -8,4 +9,10 @@ router.register(r'places', PlaceViewSet, basename='place')
 router.register(r'notes', UserNoteViewSet, basename='usernote')
 router.register(r'comments', CommentViewSet, basename='comment') # Убедитесь, что эта строка есть
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    re_path(
+        r'^places/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt$',
+        PlaceViewSet.as_view({'get': 'tiles'}),
+        name='place-tiles',
+    ),
+] + router.urls
\ No newline at end of file
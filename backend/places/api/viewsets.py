@@ -2,34 +2,65 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Max, Q, Exists, OuterRef, Prefetch, Value, BooleanField, FloatField
 from django.db.models.functions import Coalesce
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
 from django.contrib.gis.db.models.functions import Distance
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_http_date_safe
 
 from places.models import Place, UserNote, Comment, PlaceImage, NoteImage
+from places.filters import PlaceFilter, PlaceSearchFilter, PlaceOrderingFilter
+from places.export import export_queryset, iter_geojson
+from places.ingest import enqueue_images
+from places.roles import is_moderator
 from .serializers import PlaceSerializer, UserNoteSerializer, CommentSerializer
 from .permissions import IsOwnerOrAdminOrReadOnly, IsOwnerOrAdmin, IsModeratorOrAdmin
+from .pagination import KeysetCursorPagination, GeoJsonCursorPagination
+from .tiles import MAX_ZOOM, get_place_tile, is_valid_tile
+from .cache import (
+    response_cache_key, get_cached_response_data, set_cached_response_data, get_places_version,
+    get_places_activity_version, get_place_activity_version,
+)
+from .conditional import ConditionalGetMixin
+from .moderation import ModerationMixin, MODERATION_ACTIONS
+from .clusters import get_clusters, parse_bbox
+from .geo import (
+    KNNDistance, LineLocatePoint, MAX_CORRIDOR_BUFFER_M, MAX_KNN_LIMIT, batch_nearest, decode_knn_cursor,
+    encode_knn_cursor, parse_origins, parse_route, simplify_route,
+)
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.utils.urls import replace_query_param
 
-class PlaceViewSet(viewsets.ModelViewSet):
-    queryset = Place.objects.all().select_related('owner').prefetch_related('user_notes', 'favorites')
+class PlaceViewSet(ConditionalGetMixin, ModerationMixin, viewsets.ModelViewSet):
+    queryset = Place.objects.all().select_related('owner').prefetch_related('owner__groups', 'images')
     serializer_class = PlaceSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['status', 'categories']
-    search_fields = ['name', 'description', 'categories']
-    ordering_fields = ['created_at', 'name', 'notes_count', 'distance']
+    filter_backends = [DjangoFilterBackend, PlaceSearchFilter, PlaceOrderingFilter]
+    filterset_class = PlaceFilter
+    ordering_fields = [
+        'created_at', 'name', 'notes_count', 'comments_count', 'favorites_count', 'last_activity_at',
+        'distance', 'search_rank'
+    ]
+    ordering = ['name', 'id']
+    pagination_class = GeoJsonCursorPagination
+    # Счётчики и изображения меняются без updated_at, их учитывает версия данных в ETag
+    use_if_modified_since = False
+    moderation_status_field = 'status'
 
     def get_permissions(self):
         if self.action == 'toggle_favorite':
             self.permission_classes = [IsAuthenticated]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             self.permission_classes = [IsAuthenticated, IsOwnerOrAdminOrReadOnly]
-        elif self.action in ['list', 'retrieve', 'nearest']:
+        elif self.action in ['list', 'retrieve', 'nearest', 'nearest_batch', 'corridor', 'export', 'tiles', 'clusters', 'autocomplete', 'facets']:
             self.permission_classes = [AllowAny]
-        elif self.action in ['approve', 'reject']:
+        elif self.action in MODERATION_ACTIONS:
             return [IsAdminUser(), IsModeratorOrAdmin()]
         return super().get_permissions()
 
@@ -38,7 +69,7 @@ class PlaceViewSet(viewsets.ModelViewSet):
         id_in = self.request.query_params.get('id__in')
         if id_in:
             ids = [int(i) for i in id_in.split(',') if i]
-            return Place.objects.filter(id__in=ids)
+            return self.annotate_queryset(queryset.filter(id__in=ids))
         user = self.request.user
         owner_param = self.request.query_params.get('owner')
         status_param = self.request.query_params.getlist('status')
@@ -49,38 +80,139 @@ class PlaceViewSet(viewsets.ModelViewSet):
             if status_param:
                 queryset = queryset.filter(status__in=status_param)
         # Если модератор/админ (раздел модерации) — только pending
-        elif user.is_superuser or user.groups.filter(name='Moderators').exists():
+        elif is_moderator(user):
             queryset = queryset.filter(status='pending')
         # Для карты и остальных — только approved
         else:
             queryset = queryset.filter(status='approved')
+        return self.annotate_queryset(queryset)
+
+    def get_response_cache_key(self, **kwargs):
+        """
+        Ключ кэша ответа или None, если запрос нельзя отдавать из кэша:
+        кэшируются только анонимные чтения одобренных мест.
+        """
+        params = self.request.query_params
+        if self.request.user.is_authenticated or 'owner' in params or 'id__in' in params:
+            return None
+        return response_cache_key(self.request, self.action, **kwargs)
+
+    def get_etag_extra(self):
+        user = self.request.user
+        versions = [get_places_version(), get_places_activity_version()]
+        if not user.is_authenticated:
+            return versions
+        # В ответ входят заметки самого пользователя (current_user_note)
+        own_notes = UserNote.objects.filter(user=user).aggregate(last=Max('updated_at'), count=Count('id'))
+        return [*versions, user.pk, own_notes['last'], own_notes['count']]
+
+    def _cached_response(self, cache_key):
+        cached = get_cached_response_data(cache_key)
+        if cached is None:
+            return None
+        etag, last_modified, data = cached
+        if self.is_not_modified(etag, last_modified):
+            return self.not_modified_response(etag, last_modified)
+        return self.set_validators(Response(data), etag, last_modified)
+
+    def _store_response(self, cache_key, response):
+        if response.status_code == status.HTTP_200_OK:
+            last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+            set_cached_response_data(cache_key, (response['ETag'], last_modified, response.data))
+
+    def list(self, request, *args, **kwargs):
+        cache_key = self.get_response_cache_key()
+        if cache_key:
+            cached = self._cached_response(cache_key)
+            if cached is not None:
+                return cached
+        response = super().list(request, *args, **kwargs)
+        if cache_key:
+            self._store_response(cache_key, response)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        cache_key = self.get_response_cache_key(
+            activity=get_place_activity_version(kwargs[self.lookup_url_kwarg or self.lookup_field]), **kwargs,
+        )
+        if cache_key:
+            cached = self._cached_response(cache_key)
+            if cached is not None:
+                return cached
+        response = super().retrieve(request, *args, **kwargs)
+        if cache_key:
+            self._store_response(cache_key, response)
+        return response
+
+    def get_user_location(self):
+        """
+        Точка пользователя из ?lat=&lon= или None, если параметры не заданы или некорректны.
+        """
+        latitude = self.request.query_params.get('lat')
+        longitude = self.request.query_params.get('lon')
+        if not (latitude and longitude):
+            return None
+        try:
+            return Point(float(longitude), float(latitude), srid=4326)
+        except ValueError:
+            return None
+
+    def annotate_queryset(self, queryset):
+        """
+        Добавляет к queryset всё, что читает PlaceSerializer, чтобы список мест
+        обходился фиксированным числом запросов независимо от количества строк.
+        """
+        user = self.request.user
+        # notes_count и favorites_count — денормализованные поля Place, аннотации для них не нужны
+        favorites = Place.favorites.through.objects.filter(place=OuterRef('pk'))
+        if user.is_authenticated:
+            user_notes = UserNote.objects.filter(user=user).select_related('user').prefetch_related('user__groups', 'images')
+            queryset = queryset.annotate(
+                is_favorite=Exists(favorites.filter(user=user)),
+            ).prefetch_related(
+                Prefetch('user_notes', queryset=user_notes, to_attr='current_user_notes'),
+            )
+        else:
+            queryset = queryset.annotate(is_favorite=Value(False, output_field=BooleanField()))
+
+        # Ключ сортировки по активности без NULL: курсор пагинации не умеет сравнивать с NULL
+        queryset = queryset.annotate(activity_at=Coalesce('last_activity_at', 'created_at'))
+
+        # Расстояние считается только при заданной точке; без неё сортировка по distance отбрасывается
+        user_location = self.get_user_location()
+        if user_location is not None:
+            queryset = queryset.annotate(distance=Distance('location', user_location))
+        else:
+            queryset = queryset.annotate(distance=Value(None, output_field=FloatField()))
         return queryset
 
     def perform_create(self, serializer):
         status = 'approved' if self.request.user.is_superuser else 'pending'
         instance = serializer.save(owner=self.request.user, status=status)
 
-        # Обработка загрузки нескольких файлов (до 5)
-        image_files = self.request.FILES.getlist('image_files')
-        for i, img in enumerate(image_files):
-            if i >= 5:
-                break
-            PlaceImage.objects.create(place=instance, image=img)
+        # Дополнительные файлы (до 5) только складываются в очередь, обработка — в places/ingest.py
+        enqueue_images(PlaceImage, self.request.FILES.getlist('image_files'), place=instance)
 
     @action(detail=False, methods=['get'])
     def nearest(self, request):
+        """
+        Места рядом с ?lat=&lon= (опционально в пределах ?radius_km=).
+        С ?limit= (или ?k=) — KNN-режим: порядок по <-> из GiST-индекса, не больше K мест
+        и ссылка next (курсор по расстоянию и id) для подгрузки следующих.
+        """
         latitude = request.query_params.get('lat')
         longitude = request.query_params.get('lon')
         radius_km = request.query_params.get('radius_km')
+        limit = request.query_params.get('limit') or request.query_params.get('k')
 
         if not (latitude and longitude):
             return Response({"detail": "Parameters 'lat' and 'lon' are required."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            user_location = Point(float(longitude), float(latitude), srid=4326)
-        except ValueError:
+
+        user_location = self.get_user_location()
+        if user_location is None:
             return Response({"detail": "Invalid values for 'lat' or 'lon'."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # distance уже аннотирован в get_queryset по тем же lat/lon
         queryset = self.get_queryset()
 
         if radius_km:
@@ -90,16 +222,230 @@ class PlaceViewSet(viewsets.ModelViewSet):
             except ValueError:
                 return Response({"detail": "Invalid value for 'radius_km'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        queryset = queryset.annotate(distance=Distance('location', user_location)).order_by('distance')
+        if limit:
+            return self.nearest_knn(request, queryset, user_location, limit)
+
+        queryset = queryset.order_by('distance')
 
         serializer = self.get_serializer(queryset, many=True, context={'request': request, 'user_location': user_location})
         return Response(serializer.data)
 
+    def nearest_knn(self, request, queryset, user_location, limit):
+        try:
+            limit = int(limit)
+            if not 1 <= limit <= MAX_KNN_LIMIT:
+                raise ValueError
+        except ValueError:
+            return Response({"detail": f"'limit' must be between 1 and {MAX_KNN_LIMIT}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = queryset.annotate(knn_distance=KNNDistance('location', user_location))
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                after_distance, after_id = decode_knn_cursor(cursor)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(
+                Q(knn_distance__gt=after_distance) | Q(knn_distance=after_distance, id__gt=after_id)
+            )
+
+        # Берём на одну строку больше, чтобы понять, есть ли продолжение
+        places = list(queryset.order_by('knn_distance', 'id')[:limit + 1])
+        next_url = None
+        if len(places) > limit:
+            places = places[:limit]
+            last = places[-1]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encode_knn_cursor(last.knn_distance, last.id)
+            )
+
+        serializer = self.get_serializer(places, many=True, context={'request': request, 'user_location': user_location})
+        data = serializer.data
+        data['next'] = next_url
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='nearest/batch')
+    def nearest_batch(self, request):
+        """
+        Ближайшие одобренные места сразу для многих точек:
+        {"origins": [{"lat", "lon", "k"?, "radius_km"?}, ...], "k"?, "radius_km"?}.
+        Все точки обрабатываются одним LATERAL KNN-запросом; данные каждого места
+        отдаются один раз в "places", в "origins" — только id и расстояния.
+        """
+        try:
+            default_k = int(request.data.get('k', 10))
+            origins = parse_origins(request.data.get('origins'), default_k, request.data.get('radius_km'))
+        except (TypeError, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        nearest = batch_nearest(origins)
+        place_ids = {place_id for found in nearest for place_id, _ in found}
+        places = self.annotate_queryset(self.queryset.filter(pk__in=place_ids)).order_by('id')
+
+        return Response({
+            'origins': [
+                {
+                    'lat': lat, 'lon': lon,
+                    'results': [{'id': place_id, 'distance': round(distance, 2)} for place_id, distance in found],
+                }
+                for (lat, lon, _, _), found in zip(origins, nearest)
+            ],
+            'places': self.get_serializer(places, many=True).data,
+        })
+
+    @action(detail=False, methods=['post'])
+    def corridor(self, request):
+        """
+        Одобренные места в коридоре шириной buffer_m метров вокруг маршрута:
+        {"route": GeoJSON LineString, "buffer_m"?, "limit"?}. Места упорядочены
+        по положению вдоль маршрута, в properties добавляется route_position (0..1).
+        """
+        try:
+            route = parse_route(request.data.get('route'))
+            buffer_m = float(request.data.get('buffer_m', 100))
+            limit = int(request.data.get('limit', 200))
+            if not 0 < buffer_m <= MAX_CORRIDOR_BUFFER_M or not 1 <= limit <= 1000:
+                raise ValueError(f"'buffer_m' must be in (0, {MAX_CORRIDOR_BUFFER_M}] and 'limit' in [1, 1000].")
+        except (TypeError, ValueError) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        search_line, tolerance_m = simplify_route(route, buffer_m)
+        # Поиск по индексу идёт по упрощённой линии с запасом на допуск, точная проверка — по исходной
+        queryset = self.queryset.filter(status='approved', location__dwithin=(search_line, D(m=buffer_m + tolerance_m)))
+        if tolerance_m:
+            queryset = queryset.filter(location__dwithin=(route, D(m=buffer_m)))
+        queryset = (
+            self.annotate_queryset(queryset)
+            .annotate(route_position=LineLocatePoint(route, 'location'))
+            .order_by('route_position', 'id')
+        )
+        places = list(queryset[:limit])
+
+        data = self.get_serializer(places, many=True).data
+        for feature, place in zip(data['features'], places):
+            feature['properties']['route_position'] = round(place.route_position, 6)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Потоковая выгрузка всех мест: GeoJSON FeatureCollection или, с ?output=ndjson,
+        по одному Feature на строку. Фильтры: status, categories, bbox, updated_since.
+        """
+        status_param = request.query_params.get('status', 'approved')
+        if status_param not in dict(Place.STATUS_CHOICES):
+            return Response({"detail": "Invalid value for 'status'."}, status=status.HTTP_400_BAD_REQUEST)
+        if status_param != 'approved' and not is_moderator(request.user):
+            return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            bbox = request.query_params.get('bbox')
+            bbox = parse_bbox(bbox) if bbox else None
+            updated_since = request.query_params.get('updated_since')
+            if updated_since:
+                updated_since = parse_datetime(updated_since) or parse_date(updated_since)
+                if updated_since is None:
+                    raise ValueError
+        except ValueError:
+            return Response({"detail": "Invalid value for 'bbox' or 'updated_since'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ndjson = request.query_params.get('output') == 'ndjson'
+        queryset = export_queryset(status_param, request.query_params.get('categories'), bbox, updated_since)
+        response = StreamingHttpResponse(
+            iter_geojson(queryset, ndjson=ndjson, image_url=lambda name: request.build_absolute_uri(default_storage.url(name))),
+            content_type='application/x-ndjson' if ndjson else 'application/geo+json',
+        )
+        filename = 'places.ndjson' if ndjson else 'places.geojson'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # Маршрут задаётся в places/api/urls.py: роутер добавил бы слэш после .mvt
+    def tiles(self, request, z=None, x=None, y=None):
+        """
+        Векторный тайл (Mapbox Vector Tile) с одобренными местами.
+        """
+        z, x, y = int(z), int(x), int(y)
+        if not is_valid_tile(z, x, y):
+            return Response({"detail": "Invalid tile coordinates."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = HttpResponse(get_place_tile(z, x, y), content_type='application/vnd.mapbox-vector-tile')
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Кластеры мест внутри ?bbox=west,south,east,north для ?zoom=, посчитанные в БД.
+        """
+        try:
+            bbox = parse_bbox(request.query_params.get('bbox', ''))
+            zoom = int(request.query_params.get('zoom', ''))
+        except ValueError:
+            return Response({"detail": "Parameters 'bbox' (west,south,east,north) and 'zoom' are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= zoom <= MAX_ZOOM:
+            return Response({"detail": f"'zoom' must be between 0 and {MAX_ZOOM}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        status_param = request.query_params.get('status', 'approved')
+        if status_param not in dict(Place.STATUS_CHOICES):
+            return Response({"detail": "Invalid value for 'status'."}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user
+        if status_param != 'approved' and not is_moderator(user):
+            return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            return Response(get_clusters(bbox, zoom, status_param))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Подсказки по названию для строки поиска: префикс или похожее слово (pg_trgm),
+        только id, name и координаты.
+        """
+        q = request.query_params.get('q', '').strip()
+        if len(q) < 2:
+            return Response([])
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 20)
+        except ValueError:
+            return Response({"detail": "Invalid value for 'limit'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Обе ветки OR обслуживаются GIN-индексами (place_name_upper_trgm_idx и place_name_trgm_idx),
+        # так что планировщик строит BitmapOr вместо последовательного чтения таблицы
+        places = (
+            Place.objects.filter(status='approved')
+            .filter(Q(name__istartswith=q) | Q(name__trigram_word_similar=q))
+            .annotate(similarity=TrigramWordSimilarity(q, 'name'))
+            .order_by('-similarity', 'name')
+            .values('id', 'name', 'location')[:max(limit, 1)]
+        )
+        data = [
+            {'id': p['id'], 'name': p['name'], 'lon': p['location'].x, 'lat': p['location'].y}
+            for p in places
+        ]
+        response = Response(data)
+        patch_cache_control(response, public=True, max_age=30)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Количество мест по каждой категории для текущего набора фильтров одним GROUP BY.
+        """
+        places = self.filter_queryset(self.get_queryset()).order_by().values('pk')
+        counts = (
+            Place.normalized_categories.through.objects.filter(place__in=places)
+            .values('category__name')
+            .annotate(count=Count('place_id'))
+            .order_by('-count', 'category__name')
+        )
+        return Response([{'category': row['category__name'], 'count': row['count']} for row in counts])
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def toggle_favorite(self, request, pk=None):
         place = self.get_object()
         user = request.user
-        if user in place.favorites.all():
+        if place.is_favorite:
             place.favorites.remove(user)
             return Response({"status": "removed from favorites"}, status=status.HTTP_200_OK)
         else:
@@ -112,6 +458,8 @@ class PlaceViewSet(viewsets.ModelViewSet):
         if not place.can_moderate(request.user):
             return Response({'detail': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
         place.status = 'approved'
+        place.claimed_by = None
+        place.claim_expires_at = None
         place.save()
         return Response({'status': 'place approved', 'id': place.id}, status=status.HTTP_200_OK)
 
@@ -121,24 +469,31 @@ class PlaceViewSet(viewsets.ModelViewSet):
         reason = request.data.get('rejection_reason', '')
         place.status = 'rejected'
         place.rejection_reason = reason
+        place.claimed_by = None
+        place.claim_expires_at = None
         place.save()
         return Response({'status': 'place rejected', 'id': place.id, 'rejection_reason': place.rejection_reason}, status=status.HTTP_200_OK)
 
 
-class UserNoteViewSet(viewsets.ModelViewSet):
+class UserNoteViewSet(ConditionalGetMixin, ModerationMixin, viewsets.ModelViewSet):
     queryset = UserNote.objects.all().select_related('user', 'place')
     serializer_class = UserNoteSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['place', 'moderation_status']
     search_fields = ['text']
     ordering_fields = ['created_at', 'updated_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = KeysetCursorPagination
+    moderation_counter_field = 'notes_count'
+    # Изображения заметки (в том числе обработка через update() в ingest) не сдвигают updated_at
+    use_if_modified_since = False
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated()]
-        elif self.action in ['approve', 'reject']:
+        elif self.action in MODERATION_ACTIONS:
             return [IsAdminUser(), IsModeratorOrAdmin()]
         return super().get_permissions()
 
@@ -150,15 +505,15 @@ class UserNoteViewSet(viewsets.ModelViewSet):
         # иначе не фильтруем по user, возвращаем все подходящие записи
         return queryset
 
+    def get_etag_extra(self):
+        # Версию активности сдвигает любое изменение NoteImage, см. places.api.cache
+        return [get_places_activity_version()]
+
     def perform_create(self, serializer):
         status = 'approved' if self.request.user.is_superuser else 'pending'
         note = serializer.save(user=self.request.user, moderation_status=status)
-        # Обработка загрузки нескольких файлов (до 5)
-        image_files = self.request.FILES.getlist('image_files')
-        for i, img in enumerate(image_files):
-            if i >= 5:
-                break
-            NoteImage.objects.create(note=note, image=img)
+        # Дополнительные файлы (до 5) только складываются в очередь, обработка — в places/ingest.py
+        enqueue_images(NoteImage, self.request.FILES.getlist('image_files'), note=note)
 
     def perform_update(self, serializer):
         if serializer.instance.moderation_status == 'approved' and self.request.user == serializer.instance.user:
@@ -173,6 +528,8 @@ class UserNoteViewSet(viewsets.ModelViewSet):
     def approve(self, request, pk=None):
         note = self.get_object()
         note.moderation_status = 'approved'
+        note.claimed_by = None
+        note.claim_expires_at = None
         note.save()
         return Response({'status': 'note approved', 'id': note.id}, status=status.HTTP_200_OK)
 
@@ -182,24 +539,29 @@ class UserNoteViewSet(viewsets.ModelViewSet):
         reason = request.data.get('rejection_reason', '')
         note.moderation_status = 'rejected'
         note.rejection_reason = reason
+        note.claimed_by = None
+        note.claim_expires_at = None
         note.save()
         return Response({'status': 'note rejected', 'id': note.id, 'rejection_reason': note.rejection_reason}, status=status.HTTP_200_OK)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, ModerationMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all().select_related('user', 'place')
     serializer_class = CommentSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['place', 'moderation_status']
     search_fields = ['text']
     ordering_fields = ['created_at', 'updated_at']
+    ordering = ['created_at', 'id']
+    pagination_class = KeysetCursorPagination
+    moderation_counter_field = 'comments_count'
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
         elif self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated()]
-        elif self.action in ['approve', 'reject']:
+        elif self.action in MODERATION_ACTIONS:
             return [IsAdminUser(), IsModeratorOrAdmin()]
         return super().get_permissions()
 
@@ -228,6 +590,8 @@ class CommentViewSet(viewsets.ModelViewSet):
     def approve(self, request, pk=None):
         comment = self.get_object()
         comment.moderation_status = 'approved'
+        comment.claimed_by = None
+        comment.claim_expires_at = None
         comment.save()
         return Response({'status': 'comment approved', 'id': comment.id}, status=status.HTTP_200_OK)
 
@@ -237,5 +601,7 @@ class CommentViewSet(viewsets.ModelViewSet):
         reason = request.data.get('rejection_reason', '')
         comment.moderation_status = 'rejected'
         comment.rejection_reason = reason
+        comment.claimed_by = None
+        comment.claim_expires_at = None
         comment.save()
         return Response({'status': 'comment rejected', 'id': comment.id, 'rejection_reason': comment.rejection_reason}, status=status.HTTP_200_OK)
\ No newline at end of file
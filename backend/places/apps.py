@@ -7,4 +7,5 @@ class PlacesConfig(AppConfig):
     name = 'places'
 
     def ready(self):
-        import places.signals # Убедитесь, что эта строка есть и она правильная
\ No newline at end of file
+        import places.signals # Убедитесь, что эта строка есть и она правильная
+        import places.checks
\ No newline at end of file
@@ -0,0 +1,21 @@
+# backend/places/checks.py
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Версии данных, кэш ответов, кэш токенов и счётчики попаданий живут в кэше default.
+    С locmem у каждого процесса свой кэш: изменение, сделанное в одном воркере,
+    не сбрасывает закэшированное в остальных.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('LocMemCache'):
+        return []
+    return [Warning(
+        'The default cache is per-process (locmem).',
+        hint='Set CACHE_URL to a shared cache (e.g. redis://...) when running more than one worker process.',
+        id='places.W001',
+    )]
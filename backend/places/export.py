@@ -0,0 +1,91 @@
+# backend/places/export.py
+
+import json
+
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.geos import Polygon
+from django.core.files.storage import default_storage
+from django.db.models import Exists, FloatField, Func, OuterRef
+from django.db.models.functions import Cast
+
+from places.filters import category_names_q
+from places.models import Place, split_categories
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Поля выгрузки; координаты берутся из БД числами, без разбора геометрии в Python
+EXPORT_FIELDS = (
+    'id', 'name', 'description', 'categories', 'status', 'image',
+    'notes_count', 'comments_count', 'favorites_count', 'created_at', 'updated_at',
+)
+
+
+def _default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+
+
+def export_queryset(status='approved', categories=None, bbox=None, updated_since=None):
+    """
+    Плоские строки (values_list) для выгрузки, по возрастанию id.
+    bbox — (west, south, east, north), categories — строка 'Миф, Легенда' (любая из).
+    """
+    queryset = Place.objects.filter(status=status)
+    names = split_categories(categories)
+    if names:
+        links = Place.normalized_categories.through.objects.filter(category_names_q(names), place=OuterRef('pk'))
+        queryset = queryset.filter(Exists(links))
+    if bbox:
+        queryset = queryset.filter(location__intersects=Polygon.from_bbox(bbox))
+    if updated_since:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    point = Cast('location', GeometryField(srid=4326))
+    return (
+        queryset.order_by('id')
+        .annotate(
+            lon=Func(point, function='ST_X', output_field=FloatField()),
+            lat=Func(point, function='ST_Y', output_field=FloatField()),
+        )
+        .values_list('lon', 'lat', *EXPORT_FIELDS)
+    )
+
+
+def encode_feature(row, image_url=None):
+    lon, lat, *values = row
+    properties = dict(zip(EXPORT_FIELDS, values))
+    image = properties.pop('image')
+    properties['image_url'] = (image_url or default_storage.url)(image) if image else None
+    return _encoder.encode({
+        'type': 'Feature',
+        'id': properties['id'],
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': properties,
+    })
+
+
+def iter_geojson(queryset, ndjson=False, image_url=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Отдаёт выгрузку кусками строк. Строки читаются серверным курсором по chunk_size,
+    поэтому память не зависит от числа мест. ndjson=True — по одному Feature на строку.
+    """
+    if not ndjson:
+        yield '{"type":"FeatureCollection","features":[\n'
+    separator = '\n' if ndjson else ',\n'
+    buffer = []
+    first = True
+    for row in queryset.iterator(chunk_size=chunk_size):
+        feature = encode_feature(row, image_url)
+        if ndjson:
+            buffer.append(feature + separator)
+        else:
+            buffer.append(feature if first else separator + feature)
+        first = False
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+    if not ndjson:
+        yield '\n]}\n'
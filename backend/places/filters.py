@@ -1,17 +1,59 @@
 import django_filters
-from places.models import Place, UserNote, Comment
+from places.models import Place, UserNote, Comment, split_categories
 from django_filters import BaseInFilter
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchHeadline
+from django.db.models import F, Exists, OuterRef, Q
+from django.utils.html import escape
+from rest_framework.filters import SearchFilter, OrderingFilter
+
+# Маркеры совпадений в ts_headline: символы из области частного использования Unicode,
+# которых нет в HTML; в <b> они превращаются только после экранирования описания
+HEADLINE_START_SEL = '\ue000'
+HEADLINE_STOP_SEL = '\ue001'
+
+def category_names_q(names, field='category__name'):
+    """
+    Совпадение с любым из названий категорий без учёта регистра (как было при icontains по строке).
+    """
+    q = Q()
+    for name in names:
+        q |= Q(**{f'{field}__iexact': name})
+    return q
+
 
 class PlaceFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='icontains')
-    categories = django_filters.CharFilter(lookup_expr='icontains')
+    # ?categories=Миф,Легенда — по умолчанию любая из категорий, с ?categories_match=all — все сразу.
+    # Название сравнивается целиком без учёта регистра (подстрока, как при прежнем icontains, не ищется)
+    categories = django_filters.CharFilter(method='filter_categories')
+    categories_match = django_filters.ChoiceFilter(
+        choices=[('any', 'any'), ('all', 'all')], method='filter_noop'
+    )
     status = django_filters.MultipleChoiceFilter(choices=Place.STATUS_CHOICES)
     id = BaseInFilter(field_name='id', lookup_expr='in')
+    # Фильтры по денормализованным счётчикам
+    min_notes = django_filters.NumberFilter(field_name='notes_count', lookup_expr='gte')
+    min_favorites = django_filters.NumberFilter(field_name='favorites_count', lookup_expr='gte')
+    active_since = django_filters.IsoDateTimeFilter(field_name='last_activity_at', lookup_expr='gte')
 
     class Meta:
         model = Place
         fields = ['id', 'name', 'categories', 'status', 'owner']
 
+    def filter_categories(self, queryset, name, value):
+        names = split_categories(value)
+        if not names:
+            return queryset
+        links = Place.normalized_categories.through.objects.filter(place=OuterRef('pk'))
+        if self.form.cleaned_data.get('categories_match') == 'all':
+            for category_name in names:
+                queryset = queryset.filter(Exists(links.filter(category__name__iexact=category_name)))
+            return queryset
+        return queryset.filter(Exists(links.filter(category_names_q(names))))
+
+    def filter_noop(self, queryset, name, value):
+        return queryset
+
 class UserNoteFilter(django_filters.FilterSet):
     text = django_filters.CharFilter(lookup_expr='icontains')
     moderation_status = django_filters.MultipleChoiceFilter(choices=UserNote.moderation_status.field.choices)
@@ -26,4 +68,65 @@ class CommentFilter(django_filters.FilterSet):
 
     class Meta:
         model = Comment
-        fields = ['place', 'user', 'moderation_status']
\ No newline at end of file
+        fields = ['place', 'user', 'moderation_status']
+
+class PlaceSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск по Place.search_vector (словарь russian, GIN-индекс)
+    с ранжированием ts_rank и подсветкой совпадений в описании.
+    """
+    search_config = 'russian'
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = ' '.join(self.get_search_terms(request))
+        if not search_terms:
+            return queryset
+        query = SearchQuery(search_terms, config=self.search_config, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_headline=SearchHeadline(
+                'description', query, config=self.search_config,
+                start_sel=HEADLINE_START_SEL, stop_sel=HEADLINE_STOP_SEL, max_words=35, min_words=15,
+            ),
+        )
+
+
+def render_search_headline(headline):
+    """
+    Фрагмент описания для вывода как HTML: пользовательский текст экранируется,
+    единственная разметка — <b> вокруг совпадений.
+    """
+    if headline is None:
+        return None
+    return escape(headline).replace(HEADLINE_START_SEL, '<b>').replace(HEADLINE_STOP_SEL, '</b>')
+
+
+class PlaceOrderingFilter(OrderingFilter):
+    """
+    При поиске без явного ?ordering= сортирует по релевантности.
+    search_rank допустим только при поиске, distance — только при заданных lat/lon.
+    Курсорная пагинация требует ключей без NULL, поэтому last_activity_at
+    сортируется по activity_at = coalesce(last_activity_at, created_at).
+    """
+    aliases = {'last_activity_at': 'activity_at'}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        unavailable = set()
+        if not PlaceSearchFilter().get_search_terms(request):
+            unavailable.add('search_rank')
+        if view.get_user_location() is None:
+            unavailable.add('distance')
+        result = []
+        for term in valid:
+            descending, field = term.startswith('-'), term.lstrip('-')
+            if field in unavailable:
+                continue
+            field = self.aliases.get(field, field)
+            result.append(f'-{field}' if descending else field)
+        return result
+
+    def get_default_ordering(self, view):
+        if PlaceSearchFilter().get_search_terms(view.request):
+            return ('-search_rank', 'id')
+        return super().get_default_ordering(view)
@@ -0,0 +1,156 @@
+# backend/places/images.py
+
+import os
+import shutil
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Ширины производных изображений; оригинал не увеличивается
+VARIANT_WIDTHS = {
+    'thumb': 320,
+    'medium': 1024,
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def _output_formats():
+    formats = [('jpeg', 'JPEG', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True})]
+    if features.check('webp'):
+        formats.insert(0, ('webp', 'WEBP', {'quality': WEBP_QUALITY, 'method': 4}))
+    return formats
+
+
+def _derivative_name(source_name, variant, ext):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'derivatives', f'{stem}_{variant}.{ext}')
+
+
+def generate_derivatives(field_file):
+    """
+    Создаёт уменьшенные копии изображения (thumb, medium) в WebP и JPEG без EXIF.
+    Возвращает словарь для поля image_variants:
+    {'source': имя оригинала, 'original': {'width', 'height'},
+     'thumb': {'width', 'height', 'webp': путь, 'jpeg': путь}, ...}
+    """
+    field_file.open('rb')
+    try:
+        with Image.open(field_file) as source:
+            # Учитываем ориентацию из EXIF до того, как метаданные будут отброшены
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    finally:
+        field_file.close()
+
+    if image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+
+    variants = {
+        'source': field_file.name,
+        'original': {'width': image.width, 'height': image.height},
+    }
+    for variant, width in VARIANT_WIDTHS.items():
+        resized = image
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for ext, pil_format, options in _output_formats():
+            buffer = BytesIO()
+            resized.save(buffer, format=pil_format, **options)
+            name = _derivative_name(field_file.name, variant, ext)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            entry[ext] = default_storage.save(name, ContentFile(buffer.getvalue()))
+        variants[variant] = entry
+    return variants
+
+
+# Общий набор изображений синтетических данных (places.synthetic): на одни и те же файлы
+# ссылаются тысячи строк, поэтому при удалении строки они остаются в хранилище
+SHARED_IMAGE_PREFIX = 'place_images/synthetic/'
+
+
+def is_shared_image(name):
+    return bool(name) and name.startswith(SHARED_IMAGE_PREFIX)
+
+
+def delete_image_file(field_file):
+    if field_file and not is_shared_image(field_file.name):
+        field_file.delete(False)
+
+
+def delete_derivatives(variants):
+    for variant in VARIANT_WIDTHS:
+        for key, value in (variants or {}).get(variant, {}).items():
+            if key not in ('width', 'height') and value and not is_shared_image(value):
+                default_storage.delete(value)
+
+
+def refresh_derivatives(instance, field_name='image', variants_field='image_variants', force=False):
+    """
+    Пересоздаёт производные, если изображение сменилось, и сохраняет их через update(),
+    не вызывая повторно post_save. Возвращает True, если image_variants изменилось.
+    """
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field) or {}
+    if not field_file:
+        if variants:
+            delete_derivatives(variants)
+            type(instance).objects.filter(pk=instance.pk).update(**{variants_field: {}})
+            setattr(instance, variants_field, {})
+            return True
+        return False
+    if not force and variants.get('source') == field_file.name:
+        return False
+    delete_derivatives(variants)
+    try:
+        variants = generate_derivatives(field_file)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        # Битый файл не должен ломать сохранение; запоминаем ошибку, чтобы не повторять попытку
+        variants = {'source': field_file.name, 'error': str(exc)}
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants})
+    setattr(instance, variants_field, variants)
+    return True
+
+
+# --- Очередь загрузок: файл сначала кладётся в локальный spool, обработку делает воркер ---
+
+def _spool_dir():
+    return settings.IMAGE_SPOOL_DIR
+
+
+def spool_upload(uploaded_file):
+    """
+    Быстро копирует загруженный файл в локальный spool без декодирования.
+    Возвращает путь относительно IMAGE_SPOOL_DIR: '<uuid>/<исходное имя>'.
+    """
+    name = os.path.basename(uploaded_file.name) or 'upload'
+    relative = os.path.join(uuid.uuid4().hex, name)
+    path = os.path.join(_spool_dir(), relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return relative
+
+
+def spooled_path(relative):
+    return os.path.join(_spool_dir(), relative)
+
+
+def discard_spooled(relative):
+    if relative:
+        shutil.rmtree(os.path.dirname(spooled_path(relative)), ignore_errors=True)
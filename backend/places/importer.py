@@ -0,0 +1,340 @@
+# backend/places/importer.py
+
+import csv
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.fields.files import FieldFile
+from PIL import Image
+
+from places.images import generate_derivatives
+from places.models import Category, Place, split_categories
+
+STATUSES = {choice for choice, _ in Place.STATUS_CHOICES}
+NAME_MAX_LENGTH = Place._meta.get_field('name').max_length
+CATEGORIES_MAX_LENGTH = Place._meta.get_field('categories').max_length
+CATEGORY_NAME_MAX_LENGTH = Category._meta.get_field('name').max_length
+EXTERNAL_ID_MAX_LENGTH = Place._meta.get_field('external_id').max_length
+IMAGE_MAX_LENGTH = Place._meta.get_field('image').max_length
+
+STAGING_COLUMNS = ('seq', 'external_id', 'name', 'description', 'categories', 'lon', 'lat', 'status', 'image')
+
+# Временная таблица живёт до конца соединения, строки очищаются при каждом COMMIT
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS places_import_staging (
+        seq bigint, external_id text, name text, description text, categories text,
+        lon float8, lat float8, status text, image text
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Upsert по external_id; неизменившиеся строки не трогаются и не попадают в RETURNING.
+# DISTINCT ON оставляет последнюю запись, если ключ повторяется внутри пачки.
+# Статус по умолчанию (--status) ставится только новым местам: повторный или продолженный
+# импорт не должен заново одобрять места, которые модератор отклонил или оставил на проверке.
+UPSERT_SQL = """
+    INSERT INTO places_place AS p (
+        external_id, name, description, categories, location, status, owner_id, image_variants,
+        notes_count, comments_count, favorites_count, created_at, updated_at
+    )
+    SELECT DISTINCT ON (s.external_id)
+        s.external_id, s.name, coalesce(s.description, ''), s.categories,
+        ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326)::geography, coalesce(s.status, %(default_status)s),
+        %(owner_id)s, '{}'::jsonb,
+        0, 0, 0, now(), now()
+    FROM places_import_staging s
+    ORDER BY s.external_id, s.seq DESC
+    ON CONFLICT (external_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        description = EXCLUDED.description,
+        categories = EXCLUDED.categories,
+        location = EXCLUDED.location,
+        updated_at = now()
+    WHERE (p.name, p.description, p.categories, ST_AsBinary(p.location))
+          IS DISTINCT FROM
+          (EXCLUDED.name, EXCLUDED.description, EXCLUDED.categories, ST_AsBinary(EXCLUDED.location))
+    RETURNING p.id, p.external_id, (p.xmax = 0) AS inserted, coalesce(p.image, '') = '' AS without_image
+"""
+
+# Статус существующих мест меняется, только если запись источника задаёт его явно
+# (в staging это не NULL); новые места его уже получили в UPSERT_SQL и сюда не попадают
+SET_STATUS_SQL = """
+    UPDATE places_place AS p
+    SET status = s.status, updated_at = now()
+    FROM (
+        SELECT DISTINCT ON (external_id) external_id, status
+        FROM places_import_staging
+        ORDER BY external_id, seq DESC
+    ) AS s
+    WHERE p.external_id = s.external_id AND s.status IS NOT NULL AND p.status <> s.status
+    RETURNING p.id, p.external_id, false AS inserted, coalesce(p.image, '') = '' AS without_image
+"""
+
+INSERT_CATEGORIES_SQL = """
+    INSERT INTO places_category (name)
+    SELECT DISTINCT trim(n.name)
+    FROM places_import_staging s, unnest(string_to_array(s.categories, ',')) AS n(name)
+    WHERE trim(n.name) <> ''
+    ON CONFLICT (name) DO NOTHING
+"""
+
+UNLINK_CATEGORIES_SQL = """
+    DELETE FROM places_place_normalized_categories WHERE place_id = ANY(%(ids)s)
+"""
+
+RELINK_CATEGORIES_SQL = """
+    INSERT INTO places_place_normalized_categories (place_id, category_id)
+    SELECT DISTINCT p.id, c.id
+    FROM places_import_staging s
+    JOIN places_place p ON p.external_id = s.external_id
+    CROSS JOIN LATERAL unnest(string_to_array(s.categories, ',')) AS n(name)
+    JOIN places_category c ON c.name = trim(n.name)
+    WHERE p.id = ANY(%(ids)s)
+"""
+
+SET_IMAGES_SQL = """
+    UPDATE places_place AS p
+    SET image = i.image, image_variants = i.variants::jsonb
+    FROM unnest(%(ids)s::bigint[], %(images)s::text[], %(variants)s::text[]) AS i(id, image, variants)
+    WHERE p.id = i.id
+"""
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+# --- Чтение источников: все читатели потоковые и отдают «сырые» записи по одной ---
+
+def iter_ndjson(fp):
+    # Битая строка отдаётся как InvalidRecord: генератор после исключения продолжить нельзя,
+    # а номер записи должен совпадать с номером строки (для --resume)
+    for line in fp:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidRecord(f'invalid JSON: {e.msg}')
+
+
+def iter_csv(fp):
+    yield from csv.DictReader(fp)
+
+
+def iter_geojson(fp, read_size=1 << 16):
+    """
+    Потоково читает features из FeatureCollection, не загружая файл целиком:
+    после '"features": [' объекты разбираются по одному через raw_decode.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = -1
+    while position < 0:
+        chunk = fp.read(read_size)
+        if not chunk:
+            raise ValueError("GeoJSON file has no 'features' array.")
+        buffer += chunk
+        position = buffer.find('"features"')
+    buffer = buffer[position + len('"features"'):]
+
+    expect = ':['
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            chunk = fp.read(read_size)
+            if not chunk:
+                raise ValueError('Unexpected end of GeoJSON file.')
+            buffer = chunk
+            continue
+        if expect:
+            if buffer[0] != expect[0]:
+                raise ValueError("Malformed GeoJSON 'features' array.")
+            buffer = buffer[1:]
+            expect = expect[1:]
+            continue
+        if buffer[0] == ']':
+            return
+        if buffer[0] == ',':
+            buffer = buffer[1:]
+            continue
+        try:
+            feature, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = fp.read(read_size)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield feature
+
+
+READERS = {'geojson': iter_geojson, 'ndjson': iter_ndjson, 'csv': iter_csv}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return {
+        '.geojson': 'geojson', '.json': 'geojson',
+        '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.geojsonl': 'ndjson',
+        '.csv': 'csv',
+    }.get(extension)
+
+
+def _first_present(raw, *keys):
+    # 0 — допустимая координата, поэтому не `or`
+    for key in keys:
+        value = raw.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def normalize_record(raw):
+    """
+    Feature или плоская запись (CSV/NDJSON) -> кортеж колонок staging-таблицы без seq.
+    Всё, что не поместится в колонки БД, отбрасывается здесь: ошибка COPY/upsert потеряла бы всю пачку.
+    Статус None означает, что источник его не задал (см. UPSERT_SQL).
+    """
+    if isinstance(raw, InvalidRecord):
+        raise raw
+    if not isinstance(raw, dict):
+        raise InvalidRecord('record is not an object')
+    if raw.get('type') == 'Feature':
+        properties = raw.get('properties') or {}
+        geometry = raw.get('geometry') or {}
+        if geometry.get('type') != 'Point':
+            raise InvalidRecord('geometry must be a Point')
+        try:
+            lon, lat = (float(v) for v in geometry['coordinates'][:2])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidRecord('invalid Point coordinates')
+        external_id = raw.get('id') or properties.get('external_id') or properties.get('id')
+    else:
+        properties = raw
+        try:
+            lon = float(_first_present(raw, 'lon', 'longitude'))
+            lat = float(_first_present(raw, 'lat', 'latitude'))
+        except (TypeError, ValueError):
+            raise InvalidRecord('invalid lon/lat')
+        external_id = raw.get('external_id') or raw.get('id')
+
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        raise InvalidRecord('coordinates out of range')
+    name = (properties.get('name') or '').strip()
+    if not name or len(name) > NAME_MAX_LENGTH:
+        raise InvalidRecord('name is empty or too long')
+    categories = properties.get('categories')
+    if isinstance(categories, list):
+        categories = ', '.join(str(c) for c in categories)
+    names = split_categories(categories)
+    if any(len(category) > CATEGORY_NAME_MAX_LENGTH for category in names):
+        raise InvalidRecord('category name is too long')
+    categories = ', '.join(names) or None
+    if categories and len(categories) > CATEGORIES_MAX_LENGTH:
+        raise InvalidRecord('categories are too long')
+    status = properties.get('status') or None
+    if status is not None and status not in STATUSES:
+        raise InvalidRecord(f'unknown status {status!r}')
+    if external_id in (None, ''):
+        # Без идентификатора в источнике ключом служат название и координаты;
+        # слишком длинный ключ заменяется хэшем, чтобы поместиться в колонку
+        external_id = f'{name}@{lon:.6f},{lat:.6f}'
+        if len(external_id) > EXTERNAL_ID_MAX_LENGTH:
+            external_id = 'sha1:' + hashlib.sha1(external_id.encode('utf-8')).hexdigest()
+    external_id = str(external_id)
+    if len(external_id) > EXTERNAL_ID_MAX_LENGTH:
+        raise InvalidRecord('external id is too long')
+    return (
+        external_id, name, properties.get('description') or '', categories,
+        lon, lat, status, properties.get('image') or None,
+    )
+
+
+class PlaceImporter:
+    """
+    Загружает пачки записей: COPY в staging-таблицу, upsert в places_place,
+    категории и изображения — множественными запросами на пачку.
+    """
+
+    def __init__(self, owner, default_status='approved', images_dir=None, image_workers=8, derivatives=True):
+        self.owner = owner
+        self.default_status = default_status
+        self.images_dir = images_dir
+        self.image_workers = image_workers
+        self.derivatives = derivatives
+        self.inserted = self.updated = self.images = self.image_errors = 0
+
+    def prepare(self):
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_SQL)
+
+    def write_batch(self, rows):
+        """
+        rows — список (seq, *normalize_record(...)). Пачка фиксируется одной транзакцией.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # ON COMMIT DELETE ROWS не срабатывает, если команду вызвали внутри внешней транзакции
+            cursor.execute('DELETE FROM places_import_staging')
+            cursor.copy_expert(
+                f"COPY places_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer,
+            )
+            cursor.execute(UPSERT_SQL, {'owner_id': self.owner.pk, 'default_status': self.default_status})
+            changed = cursor.fetchall()
+            cursor.execute(SET_STATUS_SQL)
+            upserted = {row[0] for row in changed}
+            changed += [row for row in cursor.fetchall() if row[0] not in upserted]
+            if changed:
+                ids = [row[0] for row in changed]
+                cursor.execute(INSERT_CATEGORIES_SQL)
+                cursor.execute(UNLINK_CATEGORIES_SQL, {'ids': ids})
+                cursor.execute(RELINK_CATEGORIES_SQL, {'ids': ids})
+            self.inserted += sum(1 for row in changed if row[2])
+            self.updated += sum(1 for row in changed if not row[2])
+            if self.images_dir:
+                self._attach_images(cursor, changed, rows)
+
+    def _attach_images(self, cursor, changed, rows):
+        images = {row[1]: row[8] for row in rows if row[8]}
+        jobs = [(place_id, images[external_id]) for place_id, external_id, _, without_image in changed
+                if without_image and external_id in images]
+        if not jobs:
+            return
+        # Копирование и уменьшение изображений идёт параллельно, в БД — один UPDATE
+        with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+            results = [result for result in pool.map(self._store_image, jobs) if result]
+        self.image_errors += len(jobs) - len(results)
+        if results:
+            cursor.execute(SET_IMAGES_SQL, {
+                'ids': [r[0] for r in results],
+                'images': [r[1] for r in results],
+                'variants': [json.dumps(r[2]) for r in results],
+            })
+            self.images += len(results)
+
+    def _store_image(self, job):
+        place_id, relative_path = job
+        path = os.path.normpath(os.path.join(self.images_dir, relative_path))
+        if not path.startswith(os.path.normpath(self.images_dir) + os.sep) or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as source:
+                name = default_storage.save(
+                    os.path.join('place_images', os.path.basename(path)), File(source), max_length=IMAGE_MAX_LENGTH,
+                )
+            variants = {}
+            if self.derivatives:
+                variants = generate_derivatives(FieldFile(None, Place._meta.get_field('image'), name))
+            return place_id, name, variants
+        except (OSError, ValueError, SuspiciousFileOperation, Image.DecompressionBombError):
+            return None
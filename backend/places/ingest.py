@@ -0,0 +1,147 @@
+# backend/places/ingest.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from places.api.cache import bump_places_activity_version, bump_places_version
+from places.images import delete_derivatives, discard_spooled, generate_derivatives, spool_upload, spooled_path
+from places.models import PlaceImage, NoteImage
+
+# Модели с очередью обработки; для PlaceImage изменения видны в закэшированных ответах мест,
+# для NoteImage — в ETag заметок
+INGEST_MODELS = (PlaceImage, NoteImage)
+MAX_IMAGES_PER_UPLOAD = 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_INGEST_WORKERS, thread_name_prefix='image-ingest',
+            )
+        return _executor
+
+
+def enqueue_images(model, files, **parent):
+    """
+    Кладёт загруженные файлы в spool и создаёт строки model в статусе pending одним INSERT.
+    Декодирование, уменьшение и запись в хранилище выполняются позже воркером.
+    """
+    rows = [
+        model(processing_status='pending', spool_path=spool_upload(uploaded), **parent)
+        for uploaded in files[:MAX_IMAGES_PER_UPLOAD]
+    ]
+    if not rows:
+        return []
+    rows = model.objects.bulk_create(rows)
+    if settings.IMAGE_INGEST_WORKERS > 0:
+        ids = [row.pk for row in rows]
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, model, ids))
+    return rows
+
+
+def _run_in_thread(model, ids):
+    close_old_connections()
+    try:
+        process_pending(model, ids=ids)
+    finally:
+        connection.close()
+
+
+def claim(model, batch_size, ids=None):
+    """
+    Забирает до batch_size строк в статусе pending. SKIP LOCKED позволяет нескольким
+    воркерам разбирать очередь параллельно, не получая одни и те же строки.
+    """
+    with transaction.atomic():
+        queryset = model.objects.filter(processing_status='pending')
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        claimed = list(queryset.select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+        if claimed:
+            model.objects.filter(pk__in=[row.pk for row in claimed]).update(
+                processing_status='processing', processing_started_at=timezone.now(),
+            )
+    return claimed
+
+
+def process_image(instance):
+    """
+    Проверяет и декодирует файл из spool, переносит его в хранилище и строит производные.
+    """
+    model = type(instance)
+    path = spooled_path(instance.spool_path)
+    try:
+        with open(path, 'rb') as spooled:
+            with Image.open(spooled) as image:
+                image.verify()
+            spooled.seek(0)
+            instance.image.save(os.path.basename(path), File(spooled), save=False)
+        variants = generate_derivatives(instance.image)
+    except Exception as exc:
+        # Декодеры Pillow на битых файлах бросают не только OSError (например, SyntaxError у PNG);
+        # любая ошибка помечает только этот файл, иначе пачка зависнет в processing и воркер упадёт
+        if instance.image:
+            instance.image.delete(False)
+        model.objects.filter(pk=instance.pk).update(
+            processing_status='failed', processing_error=str(exc) or exc.__class__.__name__, spool_path='',
+        )
+        discard_spooled(instance.spool_path)
+        return False
+
+    updated = model.objects.filter(pk=instance.pk).update(
+        image=instance.image.name, image_variants=variants,
+        processing_status='ready', processing_error='', spool_path='',
+    )
+    discard_spooled(instance.spool_path)
+    if not updated:
+        # Строку (или место/заметку) удалили во время обработки: post_delete уже отработал
+        # без файла, поэтому записанное в хранилище удаляем сами
+        delete_derivatives(variants)
+        instance.image.delete(False)
+        return False
+    return True
+
+
+def process_pending(model, batch_size=20, ids=None):
+    """
+    Разбирает очередь model до опустошения (или только строки ids). Возвращает (готово, с ошибкой).
+    """
+    ready = failed = 0
+    while True:
+        claimed = claim(model, batch_size, ids=ids)
+        if not claimed:
+            break
+        for instance in claimed:
+            if process_image(instance):
+                ready += 1
+            else:
+                failed += 1
+        if model is PlaceImage:
+            bump_places_version()
+        else:
+            # Статус и варианты пишутся через update(), ETag заметок сдвигаем сами
+            bump_places_activity_version()
+    return ready, failed
+
+
+def requeue_stale(model, stale_after):
+    """
+    Возвращает в очередь строки, зависшие в processing (например, воркер упал).
+    """
+    return model.objects.filter(
+        processing_status='processing',
+        processing_started_at__lt=timezone.now() - timedelta(seconds=stale_after),
+    ).update(processing_status='pending')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+from places.api.clusters import parse_bbox
+from places.export import EXPORT_CHUNK_SIZE, export_queryset, iter_geojson
+from places.models import Place
+
+
+class Command(BaseCommand):
+    help = 'Streams places as a GeoJSON FeatureCollection or newline-delimited GeoJSON with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='Output file (default: stdout).')
+        parser.add_argument('--ndjson', action='store_true', help='Write one Feature per line instead of a FeatureCollection.')
+        parser.add_argument('--status', default='approved', choices=[choice for choice, _ in Place.STATUS_CHOICES])
+        parser.add_argument('--categories', help="Comma-separated categories, e.g. 'Миф, Легенда' (any of them).")
+        parser.add_argument('--bbox', help='west,south,east,north in degrees.')
+        parser.add_argument('--updated-since', help='ISO date or datetime.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per server-side cursor round trip.')
+
+    def handle(self, *args, **options):
+        try:
+            bbox = parse_bbox(options['bbox']) if options['bbox'] else None
+        except ValueError:
+            raise CommandError('Invalid --bbox, expected west,south,east,north.')
+        updated_since = options['updated_since']
+        if updated_since:
+            updated_since = parse_datetime(updated_since) or parse_date(updated_since)
+            if updated_since is None:
+                raise CommandError('Invalid --updated-since, expected an ISO date or datetime.')
+
+        queryset = export_queryset(options['status'], options['categories'], bbox, updated_since)
+        chunks = iter_geojson(queryset, ndjson=options['ndjson'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Places exported to {options['output']}."))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
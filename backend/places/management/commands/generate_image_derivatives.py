@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from places.api.cache import bump_places_activity_version, bump_places_version
+from places.images import refresh_derivatives
+from places.models import Place, UserNote, PlaceImage, NoteImage
+
+MODELS = (Place, PlaceImage, UserNote, NoteImage)
+
+
+class Command(BaseCommand):
+    help = 'Generates missing or outdated thumbnail/WebP derivatives for all stored images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives even if they are up to date.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in MODELS:
+            queryset = (
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .only('pk', 'image', 'image_variants').order_by('pk')
+            )
+            updated = 0
+            for instance in queryset.iterator(chunk_size=options['chunk_size']):
+                if refresh_derivatives(instance, force=options['force']):
+                    updated += 1
+                    if 'error' in instance.image_variants:
+                        self.stdout.write(self.style.WARNING(
+                            f'  {model.__name__} {instance.pk}: {instance.image_variants["error"]}'
+                        ))
+            self.stdout.write(f'  {model.__name__}: {updated} updated')
+            total += updated
+
+        if total:
+            # Варианты обновлены через update(), закэшированные ответы и ETag заметок нужно сбросить
+            bump_places_version()
+            bump_places_activity_version()
+        self.stdout.write(self.style.SUCCESS(f'Image derivatives generated for {total} images.'))
@@ -0,0 +1,107 @@
+import itertools
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from places.api.cache import bump_places_version
+from places.importer import READERS, InvalidRecord, PlaceImporter, detect_format, normalize_record
+from places.models import Place
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports places from a GeoJSON FeatureCollection, NDJSON or CSV file in a streaming fashion. '
+        'Rows are COPY-ed into a staging table in batches and upserted on external_id, so the import '
+        'can be re-run or resumed after a crash (--resume).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file.')
+        parser.add_argument('--format', choices=list(READERS), help='Input format (default: from the file extension).')
+        parser.add_argument('--owner', help='Username that owns new places (default: the first superuser).')
+        parser.add_argument('--status', default='approved', choices=[choice for choice, _ in Place.STATUS_CHOICES],
+                            help='Status for new places whose records do not specify one.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Records per COPY/upsert transaction.')
+        parser.add_argument('--images-dir', help='Directory that "image" paths in the records are relative to.')
+        parser.add_argument('--image-workers', type=int, default=8, help='Parallel image copies/resizes per batch.')
+        parser.add_argument('--no-derivatives', action='store_true',
+                            help='Do not build image derivatives now (run generate_image_derivatives later).')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip records already committed by a previous run (tracked in <path>.import-state).')
+        parser.add_argument('--max-errors', type=int, default=1000, help='Abort after this many invalid records.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or detect_format(path)
+        if input_format not in READERS:
+            raise CommandError('Cannot detect the input format, pass --format.')
+        owner = self.get_owner(options['owner'])
+
+        state_path = f'{path}.import-state'
+        skip = 0
+        if options['resume'] and os.path.exists(state_path):
+            with open(state_path) as state_file:
+                skip = json.load(state_file)['records']
+            self.stdout.write(f'Resuming after {skip} records.')
+
+        importer = PlaceImporter(
+            owner, default_status=options['status'], images_dir=options['images_dir'],
+            image_workers=options['image_workers'], derivatives=not options['no_derivatives'],
+        )
+        importer.prepare()
+
+        started = time.monotonic()
+        processed = skip
+        errors = 0
+        batch = []
+        with open(path, encoding='utf-8', newline='' if input_format == 'csv' else None) as source:
+            records = READERS[input_format](source)
+            # Уже загруженные записи пропускаются без проверки: upsert идемпотентен,
+            # поэтому повтор незафиксированной пачки после сбоя безопасен
+            for seq, raw in enumerate(itertools.islice(records, skip, None), start=skip + 1):
+                try:
+                    batch.append((seq, *normalize_record(raw)))
+                except InvalidRecord as e:
+                    errors += 1
+                    self.stderr.write(f'  record {seq}: {e}')
+                    if errors > options['max_errors']:
+                        raise CommandError('Too many invalid records, aborting.')
+                processed = seq
+                if seq % options['batch_size'] == 0:
+                    self.flush(importer, batch, processed, state_path, started, skip)
+                    batch = []
+            self.flush(importer, batch, processed, state_path, started, skip)
+
+        bump_places_version()
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Import finished: {processed} records, {importer.inserted} inserted, {importer.updated} updated, '
+            f'{errors} invalid, {importer.images} images ({importer.image_errors} failed).'
+        ))
+
+    def flush(self, importer, batch, processed, state_path, started, skip):
+        if batch:
+            importer.write_batch(batch)
+        # Отметка о прогрессе пишется только после фиксации пачки
+        with open(state_path, 'w') as state_file:
+            json.dump({'records': processed}, state_file)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'  {processed} records ({(processed - skip) / elapsed:.0f}/s), '
+            f'{importer.inserted} inserted, {importer.updated} updated'
+        )
+
+    def get_owner(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User {username!r} does not exist.')
+        owner = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if owner is None:
+            raise CommandError('No superuser found, pass --owner.')
+        return owner
@@ -1,4 +1,5 @@
-from django.core.management.base import BaseCommand
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.contrib.gis.geos import Point
 from places.models import Place, UserNote, Comment, PlaceImage, NoteImage
@@ -14,6 +15,22 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Populates the database with historical places, legendary notes, and anecdotal comments for storytellers.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=0,
+                            help='Generate N synthetic places (appends, does not wipe existing data).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for --scale mode.')
+        parser.add_argument('--centers', default=None,
+                            help='City centres as "lat,lon,weight;lat,lon,weight" (default: several Russian cities).')
+        parser.add_argument('--spread-km', type=float, default=8.0, help='Std deviation of distance from a centre.')
+        parser.add_argument('--users', type=int, default=None, help='Number of synthetic users (default: N/100).')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--notes-per-place', type=float, default=2.0)
+        parser.add_argument('--comments-per-place', type=float, default=3.0)
+        parser.add_argument('--favorites-per-place', type=float, default=1.0)
+        parser.add_argument('--image-ratio', type=float, default=0.1, help='Share of places with an image.')
+        parser.add_argument('--image-cache-size', type=int, default=64, help='Distinct images rendered and reused.')
+        parser.add_argument('--image-workers', type=int, default=None, help='Processes rendering images.')
+
     def _create_dummy_image(self, width=100, height=100, color=(255, 0, 0), text="Placeholder"):
         """Creates a dummy image file in memory."""
         image = Image.new('RGB', (width, height), color)
@@ -23,6 +40,9 @@ class Command(BaseCommand):
         return File(image_io, name=image_name)
 
     def handle(self, *args, **options):
+        if options['scale']:
+            return self.handle_scale(options)
+
         self.stdout.write(self.style.WARNING('Cleaning up existing data...'))
         Comment.objects.all().delete()
         UserNote.objects.all().delete()
@@ -276,4 +296,43 @@ class Command(BaseCommand):
         
         superuser_token = Token.objects.get(user=superuser)
         self.stdout.write(f'User: {superuser.username} (Superuser), Token: {superuser_token.key}')
-        self.stdout.write(self.style.MIGRATE_HEADING('-------------------\n'))
\ No newline at end of file
+        self.stdout.write(self.style.MIGRATE_HEADING('-------------------\n'))
+
+    def handle_scale(self, options):
+        from places.api.cache import bump_places_version
+        from places.synthetic import SyntheticDataGenerator, parse_centers
+
+        if options['scale'] < 0 or options['chunk_size'] < 1 or options['image_cache_size'] < 1:
+            raise CommandError('--scale, --chunk-size and --image-cache-size must be positive.')
+        if not 0 <= options['image_ratio'] <= 1:
+            raise CommandError('--image-ratio must be between 0 and 1.')
+        centers = None
+        if options['centers']:
+            try:
+                centers = parse_centers(options['centers'])
+            except ValueError:
+                raise CommandError('Invalid --centers, expected "lat,lon,weight;...".')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Generating {options['scale']} synthetic places..."))
+        generator = SyntheticDataGenerator(
+            options['scale'],
+            seed=options['seed'],
+            centers=centers,
+            spread_km=options['spread_km'],
+            users=options['users'],
+            chunk_size=options['chunk_size'],
+            notes_per_place=options['notes_per_place'],
+            comments_per_place=options['comments_per_place'],
+            favorites_per_place=options['favorites_per_place'],
+            image_ratio=options['image_ratio'],
+            image_cache_size=options['image_cache_size'],
+            image_workers=options['image_workers'],
+            stdout=self.stdout,
+        )
+        counts = generator.run()
+        # bulk_create не шлёт сигналов: счётчики и версию кэша обновляем в конце
+        call_command('recount_place_stats', stdout=self.stdout)
+        bump_places_version()
+        self.stdout.write(self.style.SUCCESS(
+            'Done: ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+        ))
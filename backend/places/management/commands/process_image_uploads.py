@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from places.ingest import INGEST_MODELS, process_pending, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Processes spooled image uploads: validation, decoding, derivatives and final storage writes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Images claimed per transaction.')
+        parser.add_argument(
+            '--stale-after', type=int, default=900,
+            help='Seconds after which an image stuck in "processing" is put back into the queue.',
+        )
+        parser.add_argument(
+            '--watch', type=float, default=0,
+            help='Keep running and poll the queue every N seconds instead of exiting when it is empty.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            ready = failed = 0
+            for model in INGEST_MODELS:
+                requeued = requeue_stale(model, options['stale_after'])
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'  {model.__name__}: {requeued} stale images requeued'))
+                model_ready, model_failed = process_pending(model, batch_size=options['batch_size'])
+                if model_ready or model_failed:
+                    self.stdout.write(f'  {model.__name__}: {model_ready} ready, {model_failed} failed')
+                ready += model_ready
+                failed += model_failed
+
+            if not options['watch']:
+                self.stdout.write(self.style.SUCCESS(f'Image queue drained: {ready} ready, {failed} failed.'))
+                return
+            if not ready and not failed:
+                time.sleep(options['watch'])
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from places.models import Place
+
+# Пересчитывает счётчики для диапазона id одним UPDATE и трогает только разошедшиеся строки.
+# У избранного нет времени добавления, поэтому last_activity_at не уменьшается.
+RECOUNT_SQL = """
+    UPDATE places_place AS p
+    SET notes_count = s.notes_count,
+        comments_count = s.comments_count,
+        favorites_count = s.favorites_count,
+        last_activity_at = GREATEST(p.last_activity_at, s.last_activity_at)
+    FROM (
+        SELECT
+            pp.id,
+            (SELECT count(*) FROM places_usernote n
+             WHERE n.place_id = pp.id AND n.moderation_status = 'approved') AS notes_count,
+            (SELECT count(*) FROM places_comment c
+             WHERE c.place_id = pp.id AND c.moderation_status = 'approved') AS comments_count,
+            (SELECT count(*) FROM places_place_favorites f
+             WHERE f.place_id = pp.id) AS favorites_count,
+            GREATEST(
+                (SELECT max(n.updated_at) FROM places_usernote n
+                 WHERE n.place_id = pp.id AND n.moderation_status = 'approved'),
+                (SELECT max(c.updated_at) FROM places_comment c
+                 WHERE c.place_id = pp.id AND c.moderation_status = 'approved')
+            ) AS last_activity_at
+        FROM places_place pp
+        WHERE pp.id BETWEEN %s AND %s
+    ) AS s
+    WHERE p.id = s.id
+      AND (p.notes_count, p.comments_count, p.favorites_count, p.last_activity_at)
+          IS DISTINCT FROM
+          (s.notes_count, s.comments_count, s.favorites_count, GREATEST(p.last_activity_at, s.last_activity_at))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Recounts denormalized place counters (notes, comments, favorites, last activity) in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of place ids per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Place.objects.aggregate(min_id=Min('id'), max_id=Max('id'))
+        if bounds['min_id'] is None:
+            self.stdout.write(self.style.WARNING('No places found.'))
+            return
+
+        fixed = 0
+        for start in range(bounds['min_id'], bounds['max_id'] + 1, batch_size):
+            end = start + batch_size - 1
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(RECOUNT_SQL, [start, end])
+                fixed += cursor.rowcount
+            self.stdout.write(f'  Processed ids {start}..{end}')
+
+        self.stdout.write(self.style.SUCCESS(f'Place counters recounted, {fixed} places fixed.'))
@@ -0,0 +1,136 @@
+# backend/places/metrics.py
+
+import logging
+import os
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import Http404, HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from places.middleware import normalize_method
+
+logger = logging.getLogger(__name__)
+
+# Метрики запросов пишет каждый воркер. Если задан PROMETHEUS_MULTIPROC_DIR (до импорта
+# prometheus_client), значения хранятся в mmap-файлах этого каталога, и /metrics в любом
+# воркере отдаёт сумму по всем процессам. Каталог нужно очищать при перезапуске сервера,
+# а в gunicorn — вызывать multiprocess.mark_process_dead(worker.pid) в child_exit.
+REQUEST_LABELS = ('view', 'action', 'method')
+
+REQUESTS = Counter(
+    'places_http_requests_total', 'HTTP requests by view action and status code.',
+    REQUEST_LABELS + ('status',),
+)
+REQUEST_ERRORS = Counter(
+    'places_http_request_errors_total', 'Requests that ended with a 5xx response or an unhandled exception.',
+    REQUEST_LABELS,
+)
+REQUEST_LATENCY = Histogram(
+    'places_http_request_duration_seconds', 'Request latency by view action.',
+    REQUEST_LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+# Попадания считаются в самих воркерах, а не в кэше Django: с locmem у каждого
+# процесса свой кэш, и /metrics показывал бы только воркер, ответивший на запрос
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'places_response_cache_lookups_total', 'Anonymous response cache lookups by result (hit, miss).', ['result'],
+)
+
+# Соединения с текущей БД по состоянию (active, idle, idle in transaction, ...)
+DB_CONNECTIONS_SQL = """
+    SELECT coalesce(state, 'unknown'), count(*)
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+    GROUP BY 1
+"""
+
+
+def observe_request(view, action, method, status_code, duration, failed=False):
+    labels = (view or 'unmatched', action or '', normalize_method(method))
+    REQUESTS.labels(*labels, str(status_code)).inc()
+    REQUEST_LATENCY.labels(*labels).observe(duration)
+    if failed or status_code >= 500:
+        REQUEST_ERRORS.labels(*labels).inc()
+
+
+def observe_response_cache_lookup(hit):
+    RESPONSE_CACHE_LOOKUPS.labels('hit' if hit else 'miss').inc()
+
+
+def response_cache_lookups(registry):
+    """
+    {'hit': n, 'miss': n} из счётчика попаданий в registry; в multiprocess-режиме — сумма по воркерам.
+    """
+    totals = {'hit': 0, 'miss': 0}
+    for family in registry.collect():
+        if family.name != 'places_response_cache_lookups':
+            continue
+        for sample in family.samples:
+            if sample.name.endswith('_total') and sample.labels.get('result') in totals:
+                totals[sample.labels['result']] += sample.value
+    return totals
+
+
+class ApplicationStateCollector:
+    """
+    Состояние, общее для всех воркеров, читается в момент сбора, а не копится в процессах:
+    глубина очередей модерации и соединения с БД. Доля попаданий в кэш ответов считается
+    по счётчику из registry, то есть по всем воркерам при PROMETHEUS_MULTIPROC_DIR.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def collect(self):
+        from places.api.moderation import MODERATION_QUEUES, get_queue_stats
+
+        try:
+            depth = GaugeMetricFamily('places_moderation_queue_items', 'Pending moderation items.', labels=['queue', 'state'])
+            oldest = GaugeMetricFamily(
+                'places_moderation_queue_oldest_age_seconds', 'Age of the oldest pending item.', labels=['queue'],
+            )
+            for name, (model, status_field) in MODERATION_QUEUES.items():
+                stats = get_queue_stats(model, status_field)
+                depth.add_metric([name, 'claimed'], stats['claimed'])
+                depth.add_metric([name, 'available'], stats['available'])
+                oldest.add_metric([name], stats['oldest_age_seconds'] or 0)
+            connections = GaugeMetricFamily('places_db_connections', 'Database connections by state.', labels=['state'])
+            with connection.cursor() as cursor:
+                cursor.execute(DB_CONNECTIONS_SQL)
+                for state, count in cursor.fetchall():
+                    connections.add_metric([state], count)
+            yield depth
+            yield oldest
+            yield connections
+        except DatabaseError:
+            logger.exception('Failed to collect database metrics')
+
+        stats = response_cache_lookups(self.registry)
+        lookups = stats['hit'] + stats['miss']
+        ratio = GaugeMetricFamily('places_response_cache_hit_ratio', 'Response cache hit ratio since workers started.')
+        ratio.add_metric([], stats['hit'] / lookups if lookups else 0)
+        yield ratio
+
+
+def metrics_view(request):
+    """
+    Отдаёт метрики в текстовом формате Prometheus. Если задан METRICS_TOKEN,
+    нужен заголовок Authorization: Bearer <token>.
+    """
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    state = CollectorRegistry(auto_describe=False)
+    state.register(ApplicationStateCollector(registry))
+    return HttpResponse(generate_latest(registry) + generate_latest(state), content_type=CONTENT_TYPE_LATEST)
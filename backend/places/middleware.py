@@ -0,0 +1,222 @@
+# backend/places/middleware.py
+
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('places.requests')
+
+# Сколько запросов хранить для лога медленного запроса; остальные только считаются
+MAX_CAPTURED_QUERIES = 1000
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Счётчики одного запроса: SQL (число и время), сериализация без учёта SQL внутри неё, рендеринг.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.render_started = None
+        self.queries = []
+        self.view = None
+        self.action = None
+        self._serializing = False
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.db_queries += 1
+            self.db_ms += duration
+            if len(self.queries) < MAX_CAPTURED_QUERIES:
+                self.queries.append((sql, params, duration))
+
+
+# Метод приходит от клиента; всё, что не из этого списка, сводится к 'other',
+# чтобы метки метрик не размножались произвольными строками
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+def normalize_method(method):
+    return method if method in KNOWN_METHODS else 'other'
+
+
+def view_labels(view_func, method):
+    """
+    (имя класса view, действие) для resolve-нутой view; у ViewSet действие берётся из карты методов.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    name = view_class.__name__ if view_class else getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    method = normalize_method(method).lower()
+    return name, actions.get(method, method)
+
+
+@contextmanager
+def serializer_timing():
+    """
+    Время сериализации корневого сериализатора; SQL, выполненный при обходе queryset-а
+    внутри .data, вычитается — он уже учтён в db.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics._serializing:
+        yield
+        return
+    metrics._serializing = True
+    started, db_before = time.perf_counter(), metrics.db_ms
+    try:
+        yield
+    finally:
+        metrics._serializing = False
+        metrics.serialize_ms += (time.perf_counter() - started) * 1000 - (metrics.db_ms - db_before)
+
+
+_original_data = BaseSerializer.data
+
+
+def _timed_data(self):
+    with serializer_timing():
+        return _original_data.fget(self)
+
+
+def install_serializer_timing():
+    """
+    Serializer.data и ListSerializer.data вызывают BaseSerializer.data, так что одной обёртки
+    хватает для всех сериализаторов, в том числе GeoFeatureModelSerializer.
+    """
+    if BaseSerializer.data is _original_data:
+        BaseSerializer.data = property(_timed_data)
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Включается настройкой REQUEST_INSTRUMENTATION. Для каждого запроса считает SQL-запросы,
+    время БД, сериализации и рендеринга, отдаёт их в заголовке Server-Timing и пишет
+    структурированную строку в лог places.requests. Запросы дольше SLOW_REQUEST_MS
+    логируются как warning вместе с полным SQL; параметры SQL — только при SLOW_REQUEST_LOG_PARAMS.
+
+    SQL, выполненный при чтении потокового ответа (export), уже не попадает в замер.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        request._request_metrics = metrics
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = (time.perf_counter() - metrics.started) * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_ms:.1f};desc="{metrics.db_queries} queries"',
+            f'serialize;dur={metrics.serialize_ms:.1f}',
+            f'render;dur={metrics.render_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+        self.log(request, response, metrics, total_ms)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, '_request_metrics', None)
+        if metrics is not None:
+            metrics.view, metrics.action = view_labels(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # Вызывается прямо перед response.render(); конец рендеринга ловим post-render колбэком
+        metrics = getattr(request, '_request_metrics', None)
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+
+            def finish_render(rendered):
+                metrics.render_ms = (time.perf_counter() - metrics.render_started) * 1000
+
+            response.add_post_render_callback(finish_render)
+        return response
+
+    def log(self, request, response, metrics, total_ms):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': metrics.view,
+            'action': metrics.action,
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_ms, 2),
+            'serialize_ms': round(metrics.serialize_ms, 2),
+            'render_ms': round(metrics.render_ms, 2),
+            'total_ms': round(total_ms, 2),
+        }
+        threshold = getattr(settings, 'SLOW_REQUEST_MS', 0)
+        if threshold and total_ms >= threshold:
+            record['slow'] = True
+            # Параметры содержат секреты (ключи токенов, пароли), по умолчанию пишем только текст SQL
+            log_params = getattr(settings, 'SLOW_REQUEST_LOG_PARAMS', False)
+            record['sql'] = [
+                {'sql': sql, 'params': params, 'ms': round(duration, 2)} if log_params
+                else {'sql': sql, 'ms': round(duration, 2)}
+                for sql, params, duration in metrics.queries
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False, default=str), extra={'request_metrics': record})
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False, default=str), extra={'request_metrics': record})
+
+
+class PrometheusMetricsMiddleware:
+    """
+    Включается настройкой METRICS_ENABLED: число запросов, гистограмма задержек и ошибки
+    с метками view/действие/метод (см. places.metrics). Стоит первым в MIDDLEWARE,
+    чтобы учитывать время всей цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        from places.metrics import observe_request
+        self.observe_request = observe_request
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        request._metrics_labels = (None, None)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            self.observe_request(*request._metrics_labels, request.method, 500, time.perf_counter() - started, failed=True)
+            raise
+        self.observe_request(
+            *request._metrics_labels, request.method, response.status_code, time.perf_counter() - started,
+            failed=getattr(request, '_metrics_failed', False),
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = view_labels(view_func, request.method)
+
+    def process_exception(self, request, exception):
+        # Исключение из view: Django превратит его в ответ 500 ниже по цепочке
+        request._metrics_failed = True
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("places", "0006_noteimage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="place",
+            index=models.Index(fields=["name", "id"], name="place_name_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="place",
+            index=models.Index(
+                fields=["created_at", "id"], name="place_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usernote",
+            index=models.Index(
+                fields=["created_at", "id"], name="usernote_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usernote",
+            index=models.Index(
+                fields=["place", "created_at", "id"],
+                name="usernote_place_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["created_at", "id"], name="comment_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["place", "created_at", "id"],
+                name="comment_place_created_idx",
+            ),
+        ),
+    ]
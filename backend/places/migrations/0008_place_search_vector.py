@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+    CREATE OR REPLACE FUNCTION places_place_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.categories, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER places_place_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, categories, description ON places_place
+        FOR EACH ROW EXECUTE FUNCTION places_place_search_vector_update();
+
+    UPDATE places_place SET name = name;
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+    DROP TRIGGER IF EXISTS places_place_search_vector_trigger ON places_place;
+    DROP FUNCTION IF EXISTS places_place_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("places", "0007_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="place",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="place",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="place_search_vector_idx"
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+    ]
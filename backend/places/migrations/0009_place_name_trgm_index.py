@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("places", "0008_place_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="place",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="place_name_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def split_categories(value):
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def populate_categories(apps, schema_editor):
+    Place = apps.get_model("places", "Place")
+    Category = apps.get_model("places", "Category")
+    Through = Place.normalized_categories.through
+
+    place_names = {}
+    for place_id, categories in (
+        Place.objects.exclude(categories__isnull=True).values_list("id", "categories").iterator()
+    ):
+        names = split_categories(categories)
+        if names:
+            place_names[place_id] = names
+
+    all_names = {name for names in place_names.values() for name in names}
+    Category.objects.bulk_create(
+        [Category(name=name) for name in all_names], ignore_conflicts=True
+    )
+    category_ids = dict(Category.objects.values_list("name", "id"))
+    Through.objects.bulk_create(
+        [
+            Through(place_id=place_id, category_id=category_ids[name])
+            for place_id, names in place_names.items()
+            for name in names
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("places", "0009_place_name_trgm_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Category",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Название категории"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Категория",
+                "verbose_name_plural": "Категории",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="place",
+            name="normalized_categories",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="places",
+                to="places.category",
+                verbose_name="Категории (нормализованные)",
+            ),
+        ),
+        migrations.RunPython(populate_categories, migrations.RunPython.noop),
+    ]
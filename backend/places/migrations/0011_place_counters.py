@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+POPULATE_COUNTERS_SQL = """
+    UPDATE places_place AS p
+    SET notes_count = (
+            SELECT count(*) FROM places_usernote n
+            WHERE n.place_id = p.id AND n.moderation_status = 'approved'),
+        comments_count = (
+            SELECT count(*) FROM places_comment c
+            WHERE c.place_id = p.id AND c.moderation_status = 'approved'),
+        favorites_count = (
+            SELECT count(*) FROM places_place_favorites f WHERE f.place_id = p.id),
+        last_activity_at = GREATEST(
+            (SELECT max(n.updated_at) FROM places_usernote n
+             WHERE n.place_id = p.id AND n.moderation_status = 'approved'),
+            (SELECT max(c.updated_at) FROM places_comment c
+             WHERE c.place_id = p.id AND c.moderation_status = 'approved'));
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("places", "0010_category_place_normalized_categories"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="place",
+            name="notes_count",
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, verbose_name="Одобренных заметок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="place",
+            name="comments_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Одобренных комментариев"
+            ),
+        ),
+        migrations.AddField(
+            model_name="place",
+            name="favorites_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="В избранном"),
+        ),
+        migrations.AddField(
+            model_name="place",
+            name="last_activity_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                null=True,
+                verbose_name="Последняя активность",
+            ),
+        ),
+        migrations.RunSQL(POPULATE_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
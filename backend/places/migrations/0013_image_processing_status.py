@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0012_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placeimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='ready', max_length=20, verbose_name='Статус обработки'),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='processing_error',
+            field=models.TextField(blank=True, default='', verbose_name='Ошибка обработки'),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='placeimage',
+            name='spool_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='noteimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='ready', max_length=20, verbose_name='Статус обработки'),
+        ),
+        migrations.AddField(
+            model_name='noteimage',
+            name='processing_error',
+            field=models.TextField(blank=True, default='', verbose_name='Ошибка обработки'),
+        ),
+        migrations.AddField(
+            model_name='noteimage',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='noteimage',
+            name='spool_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('places', '0013_image_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Взято в работу'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Аренда истекает'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at', 'id'], name='place_pending_queue_idx'),
+        ),
+        migrations.AddField(
+            model_name='usernote',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Взято в работу'),
+        ),
+        migrations.AddField(
+            model_name='usernote',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Аренда истекает'),
+        ),
+        migrations.AddIndex(
+            model_name='usernote',
+            index=models.Index(condition=models.Q(('moderation_status', 'pending')), fields=['created_at', 'id'], name='usernote_pending_queue_idx'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Взято в работу'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Аренда истекает'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('moderation_status', 'pending')), fields=['created_at', 'id'], name='comment_pending_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0014_moderation_queue_leases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name='Внешний идентификатор'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:00
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0015_place_external_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('last_activity_at', 'created_at'), models.F('id'), name='place_activity_id_idx'),
+        ),
+    ]
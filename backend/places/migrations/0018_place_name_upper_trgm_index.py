@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:00
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0016_place_activity_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'),
+                name='place_name_upper_trgm_idx',
+            ),
+        ),
+    ]
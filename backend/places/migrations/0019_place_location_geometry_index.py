@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:30
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0018_place_name_upper_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='place',
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    'location', output_field=django.contrib.gis.db.models.fields.GeometryField(srid=4326),
+                ),
+                name='place_location_geom_idx',
+            ),
+        ),
+    ]
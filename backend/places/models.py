@@ -1,15 +1,53 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg, Count
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Cast, Coalesce, Upper
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from places.roles import is_moderator
+from places.images import delete_derivatives, delete_image_file, discard_spooled
 
 User = get_user_model()
 
+
+def split_categories(value):
+    """
+    Разбивает строку категорий вида 'Миф, Легенда' на список уникальных названий.
+    """
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+IMAGE_PROCESSING_CHOICES = [
+    ('pending', 'Ожидает обработки'),
+    ('processing', 'Обрабатывается'),
+    ('ready', 'Готово'),
+    ('failed', 'Ошибка'),
+]
+
+
+class Category(models.Model):
+    name = models.CharField(max_length=255, unique=True, verbose_name="Название категории")
+
+    class Meta:
+        verbose_name = "Категория"
+        verbose_name_plural = "Категории"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
 class Place(models.Model):
     name = models.CharField(max_length=255, verbose_name="Название места", db_index=True)
+    # Естественный ключ записи во внешнем наборе данных, по нему import_places делает upsert
+    external_id = models.CharField(max_length=255, unique=True, blank=True, null=True, verbose_name="Внешний идентификатор")
     description = models.TextField(verbose_name="Описание (историческая справка, мифы, легенды)")
     location = models.PointField(srid=4326, geography=True, verbose_name="Географические координаты (долгота, широта)")
     categories = models.CharField(
@@ -32,6 +70,8 @@ class Place(models.Model):
         db_index=True
     )
     image = models.ImageField(upload_to='place_images/', blank=True, null=True, verbose_name="Изображение места")
+    # Уменьшенные копии и размеры изображения, заполняются сигналом (places/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Варианты изображения")
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     owner = models.ForeignKey(
@@ -47,29 +87,63 @@ class Place(models.Model):
         blank=True,
         verbose_name="Избранные пользователи"
     )
+    # Нормализованная копия строки categories, по ней работают фильтры и фасеты
+    normalized_categories = models.ManyToManyField(
+        Category,
+        related_name='places',
+        blank=True,
+        verbose_name="Категории (нормализованные)"
+    )
     rejection_reason = models.TextField(blank=True, null=True, verbose_name="Причина отклонения")
+    # Аренда элемента очереди модерации (places/api/moderation.py): кто взял в работу и до какого времени
+    claimed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Взято в работу"
+    )
+    claim_expires_at = models.DateTimeField(blank=True, null=True, verbose_name="Аренда истекает")
+    # Денормализованные счётчики, поддерживаются сигналами (places/signals.py),
+    # расхождения исправляет команда recount_place_stats
+    notes_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name="Одобренных заметок")
+    comments_count = models.PositiveIntegerField(default=0, verbose_name="Одобренных комментариев")
+    favorites_count = models.PositiveIntegerField(default=0, verbose_name="В избранном")
+    last_activity_at = models.DateTimeField(blank=True, null=True, db_index=True, verbose_name="Последняя активность")
+    # Заполняется триггером БД (миграция 0008): name — вес A, categories — B, description — C
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Место"
         verbose_name_plural = "Места"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='place_name_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='place_created_id_idx'),
+            GinIndex(fields=['search_vector'], name='place_search_vector_idx'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='place_name_trgm_idx'),
+            # name__istartswith компилируется в UPPER(name) LIKE UPPER(...), индекс по name его не обслуживает
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='place_name_upper_trgm_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(status='pending'), name='place_pending_queue_idx'),
+            # Сортировка ?ordering=last_activity_at идёт по activity_at (см. PlaceOrderingFilter)
+            models.Index(Coalesce('last_activity_at', 'created_at'), 'id', name='place_activity_id_idx'),
+            # Тайлы и кластеры фильтруют location::geometry(Geometry, 4326) && конверт: индекс по geography
+            # у полюсов и антимеридиана даёт вырожденные конверты, а выражение должно совпадать с запросом
+            GistIndex(Cast('location', models.GeometryField(srid=4326)), name='place_location_geom_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-    def update_average_rating(self):
-        approved_notes = self.user_notes.filter(moderation_status='approved', rating__isnull=False)
-        average_rating_data = approved_notes.aggregate(
-            avg_rating=Coalesce(Avg('rating'), 0.0),
-            count_rating=Count('rating')
-        )
-        self.average_rating = average_rating_data['avg_rating']
-        self.rating_count = average_rating_data['count_rating']
-        self.save()
+    def sync_categories(self):
+        """
+        Приводит normalized_categories в соответствие со строкой categories.
+        """
+        names = split_categories(self.categories)
+        if set(self.normalized_categories.values_list('name', flat=True)) == set(names):
+            return
+        categories = [Category.objects.get_or_create(name=name)[0] for name in names]
+        self.normalized_categories.set(categories)
 
     # Ensure status can be updated during moderation
     def can_moderate(self, user):
-        return user.is_superuser or user.groups.filter(name='Moderators').exists()
+        return is_moderator(user)
 
 
 class UserNote(models.Model):
@@ -91,18 +165,31 @@ class UserNote(models.Model):
         null=True,
         verbose_name="Изображение к заметке"
     )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Варианты изображения")
     rejection_reason = models.TextField(blank=True, null=True, verbose_name="Причина отклонения")
+    # Аренда элемента очереди модерации (places/api/moderation.py): кто взял в работу и до какого времени
+    claimed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Взято в работу"
+    )
+    claim_expires_at = models.DateTimeField(blank=True, null=True, verbose_name="Аренда истекает")
 
     class Meta:
         verbose_name = "Заметка пользователя"
         verbose_name_plural = "Заметки пользователей"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='usernote_created_id_idx'),
+            models.Index(fields=['place', 'created_at', 'id'], name='usernote_place_created_idx'),
+            models.Index(
+                fields=['created_at', 'id'], condition=models.Q(moderation_status='pending'), name='usernote_pending_queue_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Заметка {self.user.username} о {self.place.name}"
 
     # Ensure moderation status can be updated
     def can_moderate(self, user):
-        return user.is_superuser or user.groups.filter(name='Moderators').exists()
+        return is_moderator(user)
 
 
 class Comment(models.Model):
@@ -119,22 +206,43 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     rejection_reason = models.TextField(blank=True, null=True, verbose_name="Причина отклонения")
+    # Аренда элемента очереди модерации (places/api/moderation.py): кто взял в работу и до какого времени
+    claimed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Взято в работу"
+    )
+    claim_expires_at = models.DateTimeField(blank=True, null=True, verbose_name="Аренда истекает")
 
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='comment_created_id_idx'),
+            models.Index(fields=['place', 'created_at', 'id'], name='comment_place_created_idx'),
+            models.Index(
+                fields=['created_at', 'id'], condition=models.Q(moderation_status='pending'), name='comment_pending_queue_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Комментарий от {self.user.username} к месту {self.place.name}"
 
     def can_moderate(self, user):
-        return user.is_superuser or user.groups.filter(name='Moderators').exists()
+        return is_moderator(user)
 
 
 class PlaceImage(models.Model):
     place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='images', verbose_name='Место')
     image = models.ImageField(upload_to='place_images/', verbose_name='Изображение')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Варианты изображения')
+    # Загрузки через API обрабатываются асинхронно (places/ingest.py); пока файл в spool, image пустое
+    processing_status = models.CharField(
+        max_length=20, choices=IMAGE_PROCESSING_CHOICES, default='ready', db_index=True,
+        verbose_name='Статус обработки'
+    )
+    processing_error = models.TextField(blank=True, default='', verbose_name='Ошибка обработки')
+    processing_started_at = models.DateTimeField(blank=True, null=True)
+    spool_path = models.CharField(max_length=255, blank=True, default='', editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -146,18 +254,29 @@ class PlaceImage(models.Model):
 
 @receiver(post_delete, sender=PlaceImage)
 def delete_place_image_file(sender, instance, **kwargs):
-    if instance.image:
-        instance.image.delete(False)
+    delete_image_file(instance.image)
+    delete_derivatives(instance.image_variants)
+    discard_spooled(instance.spool_path)
 
 @receiver(post_delete, sender=Place)
 def delete_all_place_images(sender, instance, **kwargs):
     for img in instance.images.all():
-        if img.image:
-            img.image.delete(False)
+        delete_image_file(img.image)
+        delete_derivatives(img.image_variants)
+    delete_derivatives(instance.image_variants)
 
 class NoteImage(models.Model):
     note = models.ForeignKey(UserNote, on_delete=models.CASCADE, related_name='images', verbose_name='Заметка')
     image = models.ImageField(upload_to='note_images/', verbose_name='Изображение')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Варианты изображения')
+    # Загрузки через API обрабатываются асинхронно (places/ingest.py); пока файл в spool, image пустое
+    processing_status = models.CharField(
+        max_length=20, choices=IMAGE_PROCESSING_CHOICES, default='ready', db_index=True,
+        verbose_name='Статус обработки'
+    )
+    processing_error = models.TextField(blank=True, default='', verbose_name='Ошибка обработки')
+    processing_started_at = models.DateTimeField(blank=True, null=True)
+    spool_path = models.CharField(max_length=255, blank=True, default='', editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -169,11 +288,13 @@ class NoteImage(models.Model):
 
 @receiver(post_delete, sender=NoteImage)
 def delete_note_image_file(sender, instance, **kwargs):
-    if instance.image:
-        instance.image.delete(False)
+    delete_image_file(instance.image)
+    delete_derivatives(instance.image_variants)
+    discard_spooled(instance.spool_path)
 
 @receiver(post_delete, sender=UserNote)
 def delete_all_note_images(sender, instance, **kwargs):
     for img in instance.images.all():
-        if img.image:
-            img.image.delete(False)
\ No newline at end of file
+        delete_image_file(img.image)
+        delete_derivatives(img.image_variants)
+    delete_derivatives(instance.image_variants)
\ No newline at end of file
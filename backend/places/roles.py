@@ -0,0 +1,44 @@
+# places/roles.py
+from django.conf import settings
+from django.core.cache import cache
+
+MODERATORS_GROUP = 'Moderators'
+
+
+def _roles_cache_key(user_id):
+    return f'places:roles:{user_id}'
+
+
+def get_user_groups(user):
+    """
+    Названия групп пользователя. Считаются один раз за запрос (результат хранится
+    на объекте request.user) и, если задан ROLES_CACHE_TIMEOUT, между запросами.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    groups = getattr(user, '_cached_group_names', None)
+    if groups is not None:
+        return groups
+
+    timeout = getattr(settings, 'ROLES_CACHE_TIMEOUT', 0)
+    if timeout:
+        groups = cache.get(_roles_cache_key(user.pk))
+    if groups is None:
+        groups = frozenset(user.groups.values_list('name', flat=True))
+        if timeout:
+            cache.set(_roles_cache_key(user.pk), groups, timeout)
+    user._cached_group_names = groups
+    return groups
+
+
+def is_moderator(user):
+    """
+    Суперпользователь или член группы Moderators.
+    """
+    if not user or not user.is_authenticated:
+        return False
+    return user.is_superuser or MODERATORS_GROUP in get_user_groups(user)
+
+
+def invalidate_user_roles(user_ids):
+    cache.delete_many([_roles_cache_key(user_id) for user_id in user_ids])
@@ -1,14 +1,159 @@
 # backend/places/signals.py
 
-from django.db.models.signals import post_save, post_delete
+from collections import Counter
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.db.models import Avg, Count
-from places.models import Place, UserNote # Импортируем Place и UserNote
+from django.utils import timezone
+from places.models import Place, UserNote, Comment, PlaceImage, NoteImage # Импортируем модели мест
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from places.api.cache import bump_places_activity_version, bump_places_version
+from places.roles import invalidate_user_roles
+from places.images import refresh_derivatives
+
+
+def _update_place_counter(place_id, field, delta):
+    """
+    Атомарно сдвигает счётчик места через F(), без чтения строки. Счётчик не уходит ниже нуля:
+    при гонке двух удалений или каскаде без m2m_changed он мог бы нарушить CHECK и уронить
+    запрос, а расхождение исправляет recount_place_stats.
+    """
+    if not place_id or not delta:
+        return
+    updates = {field: Greatest(F(field) + delta, 0)}
+    if delta > 0:
+        updates['last_activity_at'] = timezone.now()
+    Place.objects.filter(pk=place_id).update(**updates)
+    # Счётчиков нет в тайлах и кластерах, а кэш ответов их допускает с отставанием:
+    # сдвигаем только версию активности (см. places.api.cache)
+    bump_places_activity_version([place_id])
+
+
+def apply_place_counter_deltas(field, deltas):
+    """
+    Сдвигает счётчик сразу у многих мест одним UPDATE. deltas: {place_id: delta}.
+    """
+    deltas = {place_id: delta for place_id, delta in deltas.items() if place_id and delta}
+    if not deltas:
+        return
+    column = connection.ops.quote_name(Place._meta.get_field(field).column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Place._meta.db_table} AS p
+            SET {column} = GREATEST(p.{column} + d.delta, 0),
+                last_activity_at = CASE WHEN d.delta > 0 THEN now() ELSE p.last_activity_at END
+            FROM unnest(%s::bigint[], %s::integer[]) AS d(place_id, delta)
+            WHERE p.id = d.place_id
+            """,
+            [list(deltas.keys()), list(deltas.values())],
+        )
+    bump_places_activity_version(deltas.keys())
+
+
+# --- Заметки и комментарии: учитываются только одобренные ---
+COUNTER_FIELDS = {UserNote: 'notes_count', Comment: 'comments_count'}
+
+@receiver(post_init, sender=UserNote)
+@receiver(post_init, sender=Comment)
+def remember_moderation_state(sender, instance, **kwargs):
+    # Запоминаем исходное состояние, чтобы в post_save увидеть переход без лишнего запроса.
+    # Отложенные (deferred) поля не читаем, чтобы не вызвать запрос на каждый объект.
+    state = instance.__dict__
+    instance._counted_place_id = state.get('place_id') if state.get('moderation_status') == 'approved' else None
 
 @receiver(post_save, sender=UserNote)
-def user_note_post_save(sender, instance, **kwargs):
-    pass
+@receiver(post_save, sender=Comment)
+def moderated_item_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    field = COUNTER_FIELDS[sender]
+    old_place_id = None if created else instance._counted_place_id
+    new_place_id = instance.place_id if instance.moderation_status == 'approved' else None
+    if old_place_id != new_place_id:
+        _update_place_counter(old_place_id, field, -1)
+        _update_place_counter(new_place_id, field, 1)
+    instance._counted_place_id = new_place_id
 
 @receiver(post_delete, sender=UserNote)
-def user_note_post_delete(sender, instance, **kwargs):
-    pass
\ No newline at end of file
+@receiver(post_delete, sender=Comment)
+def moderated_item_post_delete(sender, instance, **kwargs):
+    _update_place_counter(instance._counted_place_id, COUNTER_FIELDS[sender], -1)
+
+
+# --- Избранное: m2m Place.favorites, изменения возможны с обеих сторон связи ---
+@receiver(m2m_changed, sender=Place.favorites.through)
+def favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() не проверяет наличие связей, поэтому запоминаем реально удаляемые
+        links = sender.objects.filter(user=instance) if reverse else sender.objects.filter(place=instance)
+        if pk_set is not None:
+            links = links.filter(**{'place_id__in' if reverse else 'user_id__in': pk_set})
+        instance._removed_favorite_place_ids = list(links.values_list('place_id', flat=True))
+    elif action == 'post_add':
+        if reverse:
+            for place_id in pk_set:
+                _update_place_counter(place_id, 'favorites_count', 1)
+        else:
+            _update_place_counter(instance.pk, 'favorites_count', len(pk_set))
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.pop('_removed_favorite_place_ids', [])
+        for place_id, count in Counter(removed).items():
+            _update_place_counter(place_id, 'favorites_count', -count)
+
+
+# --- Производные изображений (thumb/medium, WebP + JPEG) ---
+# Подключены раньше place_post_save, чтобы версия сбрасывалась уже после записи вариантов
+@receiver(post_save, sender=Place)
+@receiver(post_save, sender=UserNote)
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_save, sender=NoteImage)
+def image_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_derivatives(instance)
+
+
+# Любое изменение места (одобрение, отклонение, редактирование, удаление) делает
+# тайлы, кластеры и закэшированные ответы устаревшими
+@receiver(post_save, sender=Place)
+def place_post_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or 'categories' in update_fields):
+        instance.sync_categories()
+    bump_places_version()
+
+@receiver(post_delete, sender=Place)
+def place_post_delete(sender, instance, **kwargs):
+    bump_places_version()
+
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_delete, sender=PlaceImage)
+def place_image_changed(sender, instance, **kwargs):
+    bump_places_version()
+
+# Изображения заметок не меняют updated_at заметки, но входят в её ETag
+@receiver(post_save, sender=NoteImage)
+@receiver(post_delete, sender=NoteImage)
+def note_image_changed(sender, instance, **kwargs):
+    bump_places_activity_version()
+
+
+# --- Роли: сбрасываем кэш групп пользователя при изменении членства ---
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_roles([instance.pk])
+    elif pk_set:
+        invalidate_user_roles(pk_set)
+    else:
+        invalidate_user_roles(instance.user_set.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate_user_roles(instance.user_set.values_list('pk', flat=True))
@@ -0,0 +1,236 @@
+# backend/places/synthetic.py
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from PIL import Image
+
+from places.images import SHARED_IMAGE_PREFIX, generate_derivatives
+from places.models import Place, UserNote, Comment, PlaceImage, Category
+
+User = get_user_model()
+
+# Города по умолчанию: (широта, долгота, вес); места распределяются вокруг центров нормально
+DEFAULT_CENTERS = [
+    (55.7963, 49.1088, 5),  # Казань
+    (55.7558, 37.6173, 8),  # Москва
+    (59.9386, 30.3141, 5),  # Санкт-Петербург
+    (56.3269, 44.0059, 2),  # Нижний Новгород
+    (54.7388, 55.9721, 2),  # Уфа
+    (55.6366, 51.8245, 1),  # Нижнекамск
+]
+KM_PER_DEGREE = 111.32
+
+CATEGORIES = [
+    'История', 'Легенда', 'Миф', 'Архитектура', 'Природа', 'Археология', 'Мечеть', 'Собор',
+    'Крепость', 'Музей', 'Театр', 'Парк', 'Родник', 'Набережная', 'Улица',
+]
+NAME_PARTS = (
+    ['Старый', 'Белый', 'Ханский', 'Купеческий', 'Тайный', 'Древний', 'Каменный', 'Зелёный', 'Дальний'],
+    ['Двор', 'Колодец', 'Курган', 'Мост', 'Сад', 'Дом', 'Холм', 'Родник', 'Храм', 'Вал', 'Овраг'],
+)
+DESCRIPTIONS = [
+    'По преданию, здесь {event} в {century} веке.',
+    'Местные жители рассказывают, что в {century} веке здесь {event}.',
+    'Летописи {century} века упоминают, что на этом месте {event}.',
+]
+EVENTS = [
+    'спрятали ханскую казну', 'видели белого змея', 'стоял дозорный пост',
+    'венчались купцы', 'бил целебный родник', 'проходил торговый путь',
+]
+CENTURIES = ['XII', 'XIII', 'XIV', 'XV', 'XVI', 'XVII', 'XVIII', 'XIX']
+NOTE_TEXTS = ['Была здесь прошлым летом.', 'Рассказ бабушки об этом месте.', 'Красивое место для прогулки.']
+COMMENT_TEXTS = ['Спасибо за историю!', 'Интересно, правда ли это?', 'Обязательно съезжу.']
+STATUS_WEIGHTS = (('approved', 80), ('pending', 15), ('rejected', 5))
+
+
+def parse_centers(value):
+    """
+    'lat,lon,weight;lat,lon,weight' -> [(lat, lon, weight)]. ValueError при ошибке.
+    """
+    centers = []
+    for part in value.split(';'):
+        lat, lon, *weight = (float(v) for v in part.split(','))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or len(weight) > 1:
+            raise ValueError(part)
+        centers.append((lat, lon, weight[0] if weight else 1))
+    return centers
+
+
+def render_image(args):
+    """
+    Рисует JPEG в отдельном процессе; только Pillow, без обращения к Django.
+    """
+    seed, width, height = args
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), tuple(rng.randrange(40, 220) for _ in range(3)))
+    for _ in range(6):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        box = (x0, y0, min(width, x0 + rng.randrange(20, width // 2)), min(height, y0 + rng.randrange(20, height // 2)))
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), box)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def build_image_cache(count, workers, seed, size=(1200, 800)):
+    """
+    Набор из count изображений, общий для всех мест: файлы рисуются пулом процессов один раз
+    и переиспользуются при следующих запусках. Возвращает [(имя в хранилище, image_variants)].
+    Файлы лежат под SHARED_IMAGE_PREFIX, и удаление мест и изображений их не трогает.
+    """
+    field = Place._meta.get_field('image')
+    names = [f'{SHARED_IMAGE_PREFIX}synthetic_{seed}_{i}.jpg' for i in range(count)]
+    missing = [i for i, name in enumerate(names) if not default_storage.exists(name)]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = pool.map(render_image, [(seed * 100003 + i, *size) for i in missing])
+            for i, content in zip(missing, rendered):
+                default_storage.save(names[i], ContentFile(content))
+    return [(name, generate_derivatives(FieldFile(None, field, name))) for name in names]
+
+
+class SyntheticDataGenerator:
+    """
+    Генерирует N мест вокруг центров городов вместе с заметками, комментариями,
+    избранным и изображениями. Всё пишется bulk_create пачками по chunk_size мест.
+    """
+
+    def __init__(self, scale, seed=0, centers=None, spread_km=8.0, users=None, chunk_size=5000,
+                 notes_per_place=2.0, comments_per_place=3.0, favorites_per_place=1.0, image_ratio=0.1,
+                 image_cache_size=64, image_workers=None, stdout=None):
+        self.scale = scale
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.centers = centers or DEFAULT_CENTERS
+        self.spread_km = spread_km
+        self.user_count = users or max(10, scale // 100)
+        self.chunk_size = chunk_size
+        self.notes_per_place = notes_per_place
+        self.comments_per_place = comments_per_place
+        self.favorites_per_place = favorites_per_place
+        self.image_ratio = image_ratio
+        self.image_cache_size = image_cache_size
+        self.image_workers = image_workers or os.cpu_count()
+        self.stdout = stdout
+        self.counts = dict.fromkeys(('places', 'notes', 'comments', 'favorites', 'images'), 0)
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self):
+        users = self.create_users()
+        categories = {category.name: category.pk for category in self._categories()}
+        images = []
+        if self.image_ratio > 0:
+            images = build_image_cache(self.image_cache_size, self.image_workers, self.seed)
+
+        center_weights = [weight for _, _, weight in self.centers]
+        for start in range(0, self.scale, self.chunk_size):
+            size = min(self.chunk_size, self.scale - start)
+            places = Place.objects.bulk_create(
+                [self.make_place(start + i, users, center_weights, images) for i in range(size)]
+            )
+            self.link_categories(places, categories)
+            self.create_related(places, users, images)
+            self.counts['places'] += len(places)
+            self.log(f'  {self.counts["places"]}/{self.scale} places')
+        return self.counts
+
+    def create_users(self):
+        # Хэш пароля считается один раз: make_password на каждого пользователя занял бы минуты
+        password = make_password('password123')
+        prefix = f'synthetic_{self.seed}_'
+        existing = User.objects.filter(username__startswith=prefix).count()
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+             for i in range(existing, self.user_count)],
+            batch_size=self.chunk_size,
+        )
+        users = User.objects.filter(username__startswith=prefix).order_by('pk')
+        return list(users.values_list('pk', flat=True)[:self.user_count])
+
+    def _categories(self):
+        Category.objects.bulk_create([Category(name=name) for name in CATEGORIES], ignore_conflicts=True)
+        return Category.objects.filter(name__in=CATEGORIES)
+
+    def make_place(self, index, users, center_weights, images):
+        rng = self.rng
+        lat0, lon0, _ = rng.choices(self.centers, weights=center_weights)[0]
+        # Нормальное распределение вокруг центра; по долготе градус короче на cos(широты)
+        distance = abs(rng.gauss(0, self.spread_km))
+        angle = rng.uniform(0, 2 * math.pi)
+        lat = max(-90.0, min(90.0, lat0 + distance * math.sin(angle) / KM_PER_DEGREE))
+        lon = lon0 + distance * math.cos(angle) / (KM_PER_DEGREE * max(math.cos(math.radians(lat0)), 0.01))
+        lon = (lon + 180) % 360 - 180
+        status = rng.choices([s for s, _ in STATUS_WEIGHTS], weights=[w for _, w in STATUS_WEIGHTS])[0]
+        place = Place(
+            name=f'{rng.choice(NAME_PARTS[0])} {rng.choice(NAME_PARTS[1])} #{index}',
+            description=rng.choice(DESCRIPTIONS).format(event=rng.choice(EVENTS), century=rng.choice(CENTURIES)),
+            location=Point(lon, lat, srid=4326),
+            categories=', '.join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+            status=status,
+            owner_id=rng.choice(users),
+        )
+        if images and rng.random() < self.image_ratio:
+            place.image, place.image_variants = rng.choice(images)
+        return place
+
+    def link_categories(self, places, categories):
+        Through = Place.normalized_categories.through
+        Through.objects.bulk_create([
+            Through(place_id=place.pk, category_id=categories[name])
+            for place in places for name in place.categories.split(', ')
+        ], batch_size=self.chunk_size)
+
+    def _poisson(self, mean):
+        # Алгоритм Кнута; средние значения малы, так что цикл короткий
+        limit, k, p = math.exp(-mean), 0, 1.0
+        while True:
+            p *= self.rng.random()
+            if p <= limit:
+                return k
+            k += 1
+
+    def create_related(self, places, users, images):
+        rng = self.rng
+        notes, comments, favorites, place_images = [], [], [], []
+        Favorite = Place.favorites.through
+        for place in places:
+            if place.status != 'approved':
+                continue
+            for _ in range(self._poisson(self.notes_per_place)):
+                notes.append(UserNote(
+                    place_id=place.pk, user_id=rng.choice(users), text=rng.choice(NOTE_TEXTS),
+                    moderation_status=rng.choices(['approved', 'pending'], weights=[85, 15])[0],
+                ))
+            for _ in range(self._poisson(self.comments_per_place)):
+                comments.append(Comment(
+                    place_id=place.pk, user_id=rng.choice(users), text=rng.choice(COMMENT_TEXTS),
+                    moderation_status=rng.choices(['approved', 'pending'], weights=[85, 15])[0],
+                ))
+            for user_id in rng.sample(users, min(len(users), self._poisson(self.favorites_per_place))):
+                favorites.append(Favorite(place_id=place.pk, user_id=user_id))
+            if place.image:
+                for _ in range(rng.randint(0, 3)):
+                    name, variants = rng.choice(images)
+                    place_images.append(PlaceImage(place_id=place.pk, image=name, image_variants=variants))
+
+        UserNote.objects.bulk_create(notes, batch_size=self.chunk_size)
+        Comment.objects.bulk_create(comments, batch_size=self.chunk_size)
+        Favorite.objects.bulk_create(favorites, batch_size=self.chunk_size, ignore_conflicts=True)
+        PlaceImage.objects.bulk_create(place_images, batch_size=self.chunk_size)
+        self.counts['notes'] += len(notes)
+        self.counts['comments'] += len(comments)
+        self.counts['favorites'] += len(favorites)
+        self.counts['images'] += len(place_images)
@@ -1,9 +1,31 @@
+import json
+import math
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from PIL import Image
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from places.models import Place, UserNote, Comment
+from django.contrib.auth.models import Group
+from django.test import override_settings
+from places.models import Place, UserNote, Comment, PlaceImage, NoteImage
+from places.api.cache import get_places_version
+from places.roles import is_moderator
+from places.ingest import enqueue_images, process_pending
+from places.synthetic import SyntheticDataGenerator
 from django.contrib.gis.geos import Point
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
 User = get_user_model()
@@ -76,6 +98,227 @@ class PlaceAPITest(APITestCase):
         self.assertIn(self.place3_user2_rejected.name, names)
         self.assertIn(self.place4_user1_approved.name, names)
 
+    def test_list_places_cursor_pagination(self):
+        response = self.client.get(self.places_list_url, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['type'], 'FeatureCollection')
+        self.assertEqual(len(response.data['features']), 1)
+        self.assertIsNotNone(response.data['next'])
+        first_name = response.data['features'][0]['properties']['name']
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['features']), 1)
+        self.assertNotEqual(response.data['features'][0]['properties']['name'], first_name)
+        self.assertIsNone(response.data['next'])
+
+    def test_list_places_constant_query_count(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
+        UserNote.objects.create(place=self.place1_admin_approved, user=self.user1, text='Заметка', moderation_status='approved')
+        self.place1_admin_approved.favorites.add(self.user1)
+
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(self.places_list_url)
+        self.assertEqual(len(response.data['features']), 2)
+
+        for i in range(10):
+            place = Place.objects.create(
+                name=f'Доп. место {i}', description='Описание',
+                location=Point(49.0 + i / 100, 55.0), owner=self.user2, status='approved'
+            )
+            UserNote.objects.create(place=place, user=self.user1, text='Заметка', moderation_status='approved')
+            place.favorites.add(self.user1, self.user2)
+
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.places_list_url)
+        self.assertEqual(len(response.data['features']), 12)
+        self.assertEqual(len(small), len(large))
+
+        favorite = next(f for f in response.data['features'] if f['id'] == self.place1_admin_approved.id)
+        self.assertTrue(favorite['properties']['is_favorite'])
+        self.assertEqual(favorite['properties']['notes_count'], 1)
+        self.assertEqual(len(favorite['properties']['current_user_note']), 1)
+
+    def _tile_url(self, place, z=12):
+        lon, lat = place.location.x, place.location.y
+        x = int((lon + 180) / 360 * 2 ** z)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * 2 ** z)
+        return reverse('place-tiles', kwargs={'z': z, 'x': x, 'y': y})
+
+    def test_place_tile(self):
+        url = self._tile_url(self.place1_admin_approved)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertIn(self.place1_admin_approved.name.encode(), response.content)
+
+        # После отклонения места закэшированный тайл не должен отдаваться
+        self.place1_admin_approved.status = 'rejected'
+        self.place1_admin_approved.save()
+        response = self.client.get(url)
+        self.assertNotIn(self.place1_admin_approved.name.encode(), response.content)
+
+    def test_place_tile_low_zoom(self):
+        for z in (0, 1):
+            response = self.client.get(self._tile_url(self.place1_admin_approved, z=z))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(self.place1_admin_approved.name.encode(), response.content)
+            self.assertIn(self.place4_user1_approved.name.encode(), response.content)
+
+        response = self.client.get(reverse('place-clusters'), {'bbox': '-180,-85,180,85', 'zoom': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(f['properties']['point_count'] for f in response.data['features']), 2)
+
+    def test_place_tile_invalid_coordinates(self):
+        response = self.client.get(reverse('place-tiles', kwargs={'z': 2, 'x': 4, 'y': 0}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_place_clusters(self):
+        url = reverse('place-clusters')
+        response = self.client.get(url, {'bbox': '48.5,55.0,50.0,56.5', 'zoom': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['type'], 'FeatureCollection')
+        self.assertEqual(sum(f['properties']['point_count'] for f in response.data['features']), 2)
+
+        response = self.client.get(url, {'bbox': '49.099,55.699,49.101,55.701', 'zoom': 16})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['features']), 1)
+        self.assertEqual(response.data['features'][0]['properties']['id'], self.place1_admin_approved.id)
+
+    def test_place_clusters_requires_bbox(self):
+        response = self.client.get(reverse('place-clusters'), {'zoom': 3})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_place_clusters_rejects_bad_zoom_and_huge_bbox(self):
+        url = reverse('place-clusters')
+        for zoom in (-1, 23, 2000):
+            response = self.client.get(url, {'bbox': '48.5,55.0,50.0,56.5', 'zoom': zoom})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Весь мир на 14-м зуме — миллионы тайлов, отказ без построения списка
+        response = self.client.get(url, {'bbox': '-180,-85,180,85', 'zoom': 14})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_full_text_search_places(self):
+        # Словарь russian приводит «кремля» к той же основе, что и «Кремль»
+        response = self.client.get(self.places_list_url, {'search': 'кремля'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [p['properties']['name'] for p in response.data['features']]
+        self.assertEqual(names, [self.place1_admin_approved.name])
+
+        response = self.client.get(self.places_list_url, {'search': 'описание'})
+        self.assertEqual(len(response.data['features']), 2)
+        self.assertIn('<b>', response.data['features'][0]['properties']['search_headline'])
+
+        # Текст описания экранируется, разметка — только <b> вокруг совпадений
+        self.place4_user1_approved.description = 'Описание <img src=x onerror=alert(1)>'
+        self.place4_user1_approved.save()
+        response = self.client.get(self.places_list_url, {'search': 'описание', 'ordering': 'search_rank'})
+        headline = next(
+            f['properties']['search_headline'] for f in response.data['features']
+            if f['id'] == self.place4_user1_approved.id
+        )
+        self.assertIn('&lt;img', headline)
+        self.assertNotIn('<img', headline)
+
+    def test_cursor_pagination_by_last_activity_and_distance(self):
+        # last_activity_at у обоих мест NULL: курсор идёт по coalesce(last_activity_at, created_at)
+        for ordering in ('-last_activity_at', 'last_activity_at', 'distance'):
+            seen = []
+            response = self.client.get(self.places_list_url, {'ordering': ordering, 'page_size': 1})
+            while True:
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                seen.extend(f['id'] for f in response.data['features'])
+                if not response.data['next']:
+                    break
+                response = self.client.get(response.data['next'])
+            self.assertEqual(sorted(seen), sorted([self.place1_admin_approved.id, self.place4_user1_approved.id]))
+
+    def test_search_rank_ordering_ignored_without_search(self):
+        response = self.client.get(self.places_list_url, {'ordering': '-search_rank'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['features']), 2)
+
+    def test_autocomplete_places(self):
+        url = reverse('place-autocomplete')
+        response = self.client.get(url, {'q': 'Крем'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [self.place1_admin_approved.id])
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'lon', 'lat'})
+        self.assertIn('max-age=30', response['Cache-Control'])
+
+        # Опечатка находится по триграммам
+        response = self.client.get(url, {'q': 'Кремлъ'})
+        self.assertEqual([p['id'] for p in response.data], [self.place1_admin_approved.id])
+
+        # Неодобренные места не подсказываются
+        response = self.client.get(url, {'q': 'Место Юзера1'})
+        self.assertEqual([p['id'] for p in response.data], [self.place4_user1_approved.id])
+
+    def test_filter_places_by_categories(self):
+        self.assertEqual(
+            set(self.place1_admin_approved.normalized_categories.values_list('name', flat=True)),
+            {'Тест', 'Историческое'}
+        )
+        response = self.client.get(self.places_list_url, {'categories': 'Историческое,Культурное'})
+        self.assertEqual(len(response.data['features']), 2)
+
+        response = self.client.get(self.places_list_url, {'categories': 'Тест,Культурное', 'categories_match': 'all'})
+        names = [p['properties']['name'] for p in response.data['features']]
+        self.assertEqual(names, [self.place4_user1_approved.name])
+
+        # Регистр не важен
+        response = self.client.get(self.places_list_url, {'categories': 'историческое'})
+        self.assertEqual([f['id'] for f in response.data['features']], [self.place1_admin_approved.id])
+
+    def test_long_category_name_is_stored(self):
+        long_name = 'Категория ' + 'я' * 140
+        self.place4_user1_approved.categories = f'Тест, {long_name}'
+        self.place4_user1_approved.save()
+        self.assertIn(long_name, self.place4_user1_approved.normalized_categories.values_list('name', flat=True))
+
+    def test_place_facets(self):
+        response = self.client.get(reverse('place-facets'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {row['category']: row['count'] for row in response.data}
+        self.assertEqual(counts, {'Тест': 2, 'Историческое': 1, 'Культурное': 1})
+
+        response = self.client.get(reverse('place-facets'), {'categories': 'Культурное'})
+        counts = {row['category']: row['count'] for row in response.data}
+        self.assertEqual(counts, {'Тест': 1, 'Культурное': 1})
+
+    def test_anonymous_list_served_from_cache(self):
+        response = self.client.get(self.places_list_url, {'ordering': 'name'})
+        self.assertEqual(len(response.data['features']), 2)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.places_list_url, {'ordering': 'name'})
+        self.assertEqual(cached.data, response.data)
+
+        # Одобрение места меняет версию данных и сбрасывает кэш
+        self.place2_user1_pending.status = 'approved'
+        self.place2_user1_pending.save()
+        response = self.client.get(self.places_list_url, {'ordering': 'name'})
+        self.assertEqual(len(response.data['features']), 3)
+
+    @override_settings(ROLES_CACHE_TIMEOUT=300)
+    def test_moderator_role_resolved_once(self):
+        moderators = Group.objects.create(name='Moderators')
+        self.user2.groups.add(moderators)
+
+        user = User.objects.get(pk=self.user2.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_moderator(user))
+            self.assertTrue(is_moderator(user))
+            self.assertTrue(self.place2_user1_pending.can_moderate(user))
+        # Следующий запрос (новый объект пользователя) берёт роли из кэша
+        next_request_user = User.objects.get(pk=self.user2.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_moderator(next_request_user))
+
+        # Изменение членства в группе сбрасывает кэш
+        self.user2.groups.remove(moderators)
+        self.assertFalse(is_moderator(User.objects.get(pk=self.user2.pk)))
+
     # Temporarily commented out due to TypeError with GeoJSON
     # def test_create_place_authenticated(self):
     #     self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
@@ -154,6 +397,285 @@ class PlaceAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Place.objects.count(), 3)
 
+    def test_nearest_knn_with_cursor(self):
+        url = reverse('place-nearest')
+        response = self.client.get(url, {'lat': 55.7, 'lon': 49.1, 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([f['id'] for f in response.data['features']], [self.place1_admin_approved.id])
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([f['id'] for f in response.data['features']], [self.place4_user1_approved.id])
+        self.assertGreater(response.data['features'][0]['properties']['distance'], 0)
+        self.assertIsNone(response.data['next'])
+
+        # Радиус и K вместе: дальнее место отсекается радиусом
+        response = self.client.get(url, {'lat': 55.7, 'lon': 49.1, 'k': 5, 'radius_km': 5})
+        self.assertEqual([f['id'] for f in response.data['features']], [self.place1_admin_approved.id])
+
+        response = self.client.get(url, {'lat': 55.7, 'lon': 49.1, 'limit': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nearest_batch(self):
+        url = reverse('place-nearest-batch')
+        response = self.client.post(url, {
+            'k': 2,
+            'origins': [
+                {'lat': 55.7, 'lon': 49.1},
+                {'lat': 55.6, 'lon': 49.4, 'k': 1},
+                {'lat': 55.6, 'lon': 49.4, 'radius_km': 0.5},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        origins = response.data['origins']
+        self.assertEqual([r['id'] for r in origins[0]['results']], [self.place1_admin_approved.id, self.place4_user1_approved.id])
+        self.assertEqual([r['id'] for r in origins[1]['results']], [self.place4_user1_approved.id])
+        self.assertEqual([r['id'] for r in origins[2]['results']], [self.place4_user1_approved.id])
+        # Каждое место отдаётся один раз, даже если найдено для нескольких точек
+        self.assertEqual(
+            sorted(f['id'] for f in response.data['places']['features']),
+            sorted([self.place1_admin_approved.id, self.place4_user1_approved.id]),
+        )
+
+        response = self.client.post(url, {'origins': [{'lat': 200, 'lon': 49.1}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_corridor_orders_places_along_route(self):
+        url = reverse('place-corridor')
+        coordinates = [[49.45, 55.6], [49.4, 55.6], [49.1, 55.7], [49.0, 55.7]]
+        route = {'type': 'LineString', 'coordinates': coordinates}
+        response = self.client.post(url, {'route': route, 'buffer_m': 500}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [f['id'] for f in response.data['features']],
+            [self.place4_user1_approved.id, self.place1_admin_approved.id],
+        )
+        positions = [f['properties']['route_position'] for f in response.data['features']]
+        self.assertLess(positions[0], positions[1])
+
+        # Длинный маршрут (больше порога упрощения) даёт тот же результат
+        dense = [
+            [lon0 + (lon1 - lon0) * i / 300, lat0 + (lat1 - lat0) * i / 300]
+            for (lon0, lat0), (lon1, lat1) in zip(coordinates, coordinates[1:])
+            for i in range(300)
+        ] + [coordinates[-1]]
+        response = self.client.post(url, {'route': {'type': 'LineString', 'coordinates': dense[::-1]}, 'buffer_m': 500}, format='json')
+        self.assertEqual(
+            [f['id'] for f in response.data['features']],
+            [self.place1_admin_approved.id, self.place4_user1_approved.id],
+        )
+
+        response = self.client.post(url, {'route': {'type': 'Point', 'coordinates': [49.1, 55.7]}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, SLOW_REQUEST_MS=0)
+    def test_request_instrumentation(self):
+        with self.assertLogs('places.requests', 'INFO') as logs:
+            response = self.client.get(self.places_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'serialize;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['view'], record['action'], record['status']), ('PlaceViewSet', 'list', 200))
+        self.assertGreater(record['db_queries'], 0)
+        self.assertNotIn('sql', record)
+
+        # Медленный запрос пишется как warning вместе с SQL
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
+        with override_settings(SLOW_REQUEST_MS=0.0001), self.assertLogs('places.requests', 'WARNING') as logs:
+            self.client.get(reverse('place-detail', args=[self.place1_admin_approved.pk]))
+        record = logs.records[-1].request_metrics
+        self.assertEqual((record['action'], record['slow']), ('retrieve', True))
+        self.assertTrue(any('places_place' in query['sql'] for query in record['sql']))
+        # Ключ токена из поиска по authtoken_token не попадает в лог без SLOW_REQUEST_LOG_PARAMS
+        self.assertFalse(any('params' in query for query in record['sql']))
+        self.assertNotIn(self.user1_token, logs.output[-1])
+
+    @override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('place-nearest'), {'lat': 55.7, 'lon': 49.1})
+        self.client.get(reverse('place-list'))
+        self.client.get(reverse('place-list'))
+        # Произвольный метод от клиента не порождает новых меток
+        self.client.generic('XRANDOM1F3A', reverse('place-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('places_http_requests_total{view="PlaceViewSet",action="nearest",method="GET",status="200"}', body)
+        self.assertIn('places_http_request_duration_seconds_bucket{view="PlaceViewSet",action="nearest"', body)
+        self.assertIn('places_moderation_queue_items{queue="places",state="available"} 1.0', body)
+        self.assertIn('places_db_connections{', body)
+        self.assertIn('places_response_cache_hit_ratio', body)
+        self.assertIn('places_response_cache_lookups_total{result="hit"}', body)
+        self.assertIn('places_http_requests_total{view="PlaceViewSet",action="other",method="other",status="405"}', body)
+        self.assertNotIn('XRANDOM1F3A', body)
+        self.assertNotIn('xrandom1f3a', body)
+
+    def test_metrics_endpoint_disabled(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_streams_features(self):
+        url = reverse('place-export')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        collection = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(collection['type'], 'FeatureCollection')
+        self.assertEqual(
+            [f['id'] for f in collection['features']],
+            sorted([self.place1_admin_approved.id, self.place4_user1_approved.id]),
+        )
+        self.assertEqual(collection['features'][0]['geometry']['coordinates'], [49.1, 55.7])
+
+        response = self.client.get(url, {'output': 'ndjson', 'categories': 'Культурное'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.place4_user1_approved.id])
+
+        response = self.client.get(url, {'bbox': '49.0,55.65,49.2,55.75'})
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))['features']), 1)
+
+        self.assertEqual(self.client.get(url, {'status': 'pending'}).status_code, status.HTTP_403_FORBIDDEN)
+
+        output = StringIO()
+        call_command('export_places', '--ndjson', '--status', 'pending', stdout=output)
+        self.assertEqual([json.loads(line)['id'] for line in output.getvalue().splitlines()], [self.place2_user1_pending.id])
+
+    def test_import_places_upserts_on_external_id(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'places.geojson')
+        features = [
+            {'type': 'Feature', 'id': 'osm-1', 'geometry': {'type': 'Point', 'coordinates': [49.12, 55.79]},
+             'properties': {'name': 'Башня Сююмбике', 'categories': ['Легенда', 'Архитектура']}},
+            {'type': 'Feature', 'id': 'osm-2', 'geometry': {'type': 'Point', 'coordinates': [49.11, 55.80]},
+             'properties': {'name': 'Озеро Кабан', 'categories': 'Миф', 'status': 'pending'}},
+            {'type': 'Feature', 'id': 'osm-3', 'geometry': {'type': 'Point', 'coordinates': [500, 55.80]},
+             'properties': {'name': 'Неверные координаты'}},
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features}, f, ensure_ascii=False)
+
+        output = StringIO()
+        call_command('import_places', path, '--batch-size', '2', stdout=output, stderr=StringIO())
+        self.assertIn('2 inserted, 0 updated, 1 invalid', output.getvalue())
+        tower = Place.objects.get(external_id='osm-1')
+        self.assertEqual((tower.status, tower.owner), ('approved', self.admin_user))
+        self.assertEqual(sorted(tower.normalized_categories.values_list('name', flat=True)), ['Архитектура', 'Легенда'])
+        self.assertEqual(Place.objects.get(external_id='osm-2').status, 'pending')
+        self.assertFalse(os.path.exists(path + '.import-state'))
+
+        # Повторный импорт обновляет только изменившиеся записи
+        features[0]['properties']['name'] = 'Башня Сююмбике (падающая)'
+        # Решение модератора сохраняется: статус по умолчанию ставится только новым местам
+        Place.objects.filter(pk=tower.pk).update(status='rejected')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features[:2]}, f, ensure_ascii=False)
+        output = StringIO()
+        call_command('import_places', path, stdout=output, stderr=StringIO())
+        self.assertIn('0 inserted, 1 updated', output.getvalue())
+        tower.refresh_from_db()
+        self.assertEqual(tower.name, 'Башня Сююмбике (падающая)')
+        self.assertEqual(tower.status, 'rejected')
+        self.assertEqual(Place.objects.filter(external_id__isnull=False).count(), 2)
+
+        # Явный статус в источнике перезаписывает текущий
+        features[1]['properties']['status'] = 'approved'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features[:2]}, f, ensure_ascii=False)
+        output = StringIO()
+        call_command('import_places', path, stdout=output, stderr=StringIO())
+        self.assertIn('0 inserted, 1 updated', output.getvalue())
+        self.assertEqual(Place.objects.get(external_id='osm-2').status, 'approved')
+        tower.refresh_from_db()
+        self.assertEqual(tower.status, 'rejected')
+
+    def test_import_places_skips_records_that_do_not_fit(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'places.ndjson')
+        lines = [
+            json.dumps({'id': 'zero', 'name': 'Нулевой меридиан', 'lon': 0, 'lat': 51.48}),
+            '{"id": "broken", "name": ',
+            json.dumps({'id': 'x' * 300, 'name': 'Длинный id', 'lon': 49.1, 'lat': 55.7}),
+            json.dumps({'id': 'cat', 'name': 'Длинная категория', 'lon': 49.1, 'lat': 55.7, 'categories': 'к' * 150}),
+            json.dumps({'name': 'Н' * 255, 'lon': 49.1, 'lat': 55.7}),
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        output = StringIO()
+        call_command('import_places', path, stdout=output, stderr=StringIO())
+        self.assertIn('5 records, 2 inserted, 0 updated, 3 invalid', output.getvalue())
+        self.assertEqual(Place.objects.get(external_id='zero').location.x, 0)
+        # Ключ из длинного названия и координат заменён хэшем
+        self.assertTrue(Place.objects.get(name='Н' * 255).external_id.startswith('sha1:'))
+
+    def test_populate_data_scale_mode(self):
+        existing = Place.objects.count()
+        options = ['--scale', '30', '--seed', '7', '--chunk-size', '8', '--image-ratio', '0',
+                   '--centers', '55.79,49.12,1']
+        call_command('populate_data', *options, stdout=StringIO())
+        self.assertEqual(Place.objects.count(), existing + 30)
+        synthetic = Place.objects.filter(owner__username__startswith='synthetic_7_').order_by('id')
+        names = list(synthetic.values_list('name', flat=True))
+        # Все места рядом с заданным центром, категории связаны, счётчики пересчитаны
+        for place in synthetic:
+            self.assertLess(abs(place.location.y - 55.79), 1)
+            self.assertEqual(place.normalized_categories.count(), len(place.categories.split(', ')))
+            self.assertEqual(place.notes_count, place.user_notes.filter(moderation_status='approved').count())
+
+        # Тот же seed даёт те же данные
+        synthetic.delete()
+        call_command('populate_data', *options, stdout=StringIO())
+        self.assertEqual(list(synthetic.values_list('name', flat=True)), names)
+
+    def test_deleting_synthetic_place_keeps_shared_images(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with self.settings(MEDIA_ROOT=media_root):
+            SyntheticDataGenerator(20, seed=3, image_ratio=1, image_cache_size=2, image_workers=1).run()
+            images = PlaceImage.objects.filter(place__owner__username__startswith='synthetic_3_')
+            place = Place.objects.filter(owner__username__startswith='synthetic_3_').exclude(image='').first()
+            shared = [place.image.name, place.image_variants['thumb']['jpeg']]
+            shared += [image.image.name for image in images]
+
+            # На те же файлы ссылаются другие места: удаление одного их не трогает
+            images.delete()
+            place.delete()
+            for name in shared:
+                self.assertTrue(default_storage.exists(name), name)
+
+    def test_image_derivatives(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), (200, 100, 50)).save(buffer, format='JPEG')
+        upload = SimpleUploadedFile('big.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+        with self.settings(MEDIA_ROOT=media_root):
+            image = PlaceImage.objects.create(place=self.place1_admin_approved, image=upload)
+            variants = image.image_variants
+            self.assertEqual(variants['original'], {'width': 2000, 'height': 1000})
+            self.assertEqual((variants['thumb']['width'], variants['thumb']['height']), (320, 160))
+            self.assertEqual(variants['medium']['width'], 1024)
+            self.assertTrue(default_storage.exists(variants['thumb']['jpeg']))
+
+            response = self.client.get(reverse('place-detail', args=[self.place1_admin_approved.id]))
+            served = response.data['properties']['images'][0]['image_variants']
+            self.assertTrue(served['thumb']['jpeg'].startswith('http://testserver/media/'))
+
+            # Бэкфилл восстанавливает варианты у старых записей
+            PlaceImage.objects.filter(pk=image.pk).update(image_variants={})
+            call_command('generate_image_derivatives', stdout=open(os.devnull, 'w'))
+            image.refresh_from_db()
+            self.assertEqual(image.image_variants['medium']['height'], 512)
+
+            image.delete()
+            self.assertFalse(default_storage.exists(variants['thumb']['jpeg']))
+
 class UserNoteAPITest(APITestCase):
     def setUp(self):
         self.admin_user = User.objects.create_superuser('admin_note', 'admin_note@test.com', 'adminpass')
@@ -184,19 +706,19 @@ class UserNoteAPITest(APITestCase):
 
         self.note1_user1_approved = UserNote.objects.create(
             place=self.place, user=self.user1, text='Отличная заметка от user1.',
-            moderation_status='approved', rating=5
+            moderation_status='approved'
         )
         self.note2_user2_pending = UserNote.objects.create(
             place=self.place, user=self.user2, text='Заметка на модерации от user2.',
-            moderation_status='pending', rating=3
+            moderation_status='pending'
         )
         self.note3_user3_rejected = UserNote.objects.create(
             place=self.place, user=self.user3, text='Отклоненная заметка от user3.',
-            moderation_status='rejected', rating=1
+            moderation_status='rejected'
         )
         self.note4_user1_approved_place2 = UserNote.objects.create(
             place=self.place2, user=self.user1, text='Вторая заметка от user1 к другому месту.',
-            moderation_status='approved', rating=4
+            moderation_status='approved'
         )
 
     def test_list_notes_anonymous(self):
@@ -207,19 +729,18 @@ class UserNoteAPITest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
         response = self.client.get(self.notes_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        texts = [n['text'] for n in response.data]
+        self.assertEqual(len(response.data['results']), 2)
+        texts = [n['text'] for n in response.data['results']]
         self.assertIn(self.note1_user1_approved.text, texts)
         self.assertIn(self.note4_user1_approved_place2.text, texts)
         self.assertNotIn(self.note2_user2_pending.text, texts)
         self.assertNotIn(self.note3_user3_rejected.text, texts)
 
-    def test_create_note_rating_calculation(self):
+    def test_create_note_counter_calculation(self):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user3_token)
         new_data = {
             'place': self.place2.id,
             'text': 'Новая заметка от user3 к place2.',
-            'rating': 5
         }
         response = self.client.post(self.notes_list_url, new_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -227,8 +748,7 @@ class UserNoteAPITest(APITestCase):
         self.assertEqual(new_note.moderation_status, 'pending')
 
         self.place2.refresh_from_db()
-        self.assertAlmostEqual(float(self.place2.average_rating), 4.0)  # Only approved notes count
-        self.assertEqual(self.place2.rating_count, 1)
+        self.assertEqual(self.place2.notes_count, 1)  # Only approved notes count
 
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token)
         response = self.client.patch(reverse('usernote-detail', args=[new_note.id]) + 'approve/', format='json')
@@ -237,8 +757,233 @@ class UserNoteAPITest(APITestCase):
         self.assertEqual(new_note.moderation_status, 'approved')
 
         self.place2.refresh_from_db()
-        self.assertAlmostEqual(float(self.place2.average_rating), (4.0 + 5.0) / 2)
-        self.assertEqual(self.place2.rating_count, 2)
+        self.assertEqual(self.place2.notes_count, 2)
+
+    def test_note_images_processed_asynchronously(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        good = BytesIO()
+        Image.new('RGB', (800, 600), (10, 120, 200)).save(good, format='PNG')
+        uploads = [
+            SimpleUploadedFile('photo.png', good.getvalue(), content_type='image/png'),
+            SimpleUploadedFile('broken.png', b'not an image', content_type='image/png'),
+        ]
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user3_token)
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_SPOOL_DIR=os.path.join(media_root, 'spool'), IMAGE_INGEST_WORKERS=0):
+            response = self.client.post(self.notes_list_url, {
+                'place': self.place2.id, 'text': 'Заметка с фото', 'image_files': uploads,
+            }, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual([img['processing_status'] for img in response.data['images']], ['pending', 'pending'])
+            self.assertIsNone(response.data['images'][0]['image_url'])
+
+            call_command('process_image_uploads', stdout=open(os.devnull, 'w'))
+
+            ready, failed = NoteImage.objects.filter(note_id=response.data['id']).order_by('id')
+            self.assertEqual(ready.processing_status, 'ready')
+            self.assertTrue(default_storage.exists(ready.image.name))
+            self.assertEqual(ready.image_variants['original'], {'width': 800, 'height': 600})
+            self.assertEqual(failed.processing_status, 'failed')
+            self.assertFalse(failed.image)
+            self.assertEqual(os.listdir(os.path.join(media_root, 'spool')), [])
+
+    def test_image_processing_survives_decoder_errors_and_deleted_rows(self):
+        from unittest import mock
+        from places.ingest import claim, process_image
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        good = BytesIO()
+        Image.new('RGB', (64, 64), (10, 120, 200)).save(good, format='PNG')
+        with self.settings(MEDIA_ROOT=media_root, IMAGE_SPOOL_DIR=os.path.join(media_root, 'spool'), IMAGE_INGEST_WORKERS=0):
+            rows = enqueue_images(NoteImage, [
+                SimpleUploadedFile(f'photo{i}.png', good.getvalue(), content_type='image/png') for i in range(2)
+            ], note=self.note1_user1_approved)
+            first, second = claim(NoteImage, 10)
+
+            # Ошибка декодера, не являющаяся OSError, помечает только этот файл
+            with mock.patch('places.ingest.Image.open', side_effect=SyntaxError('broken PNG chunk')):
+                self.assertFalse(process_image(first))
+            first.refresh_from_db()
+            self.assertEqual((first.processing_status, first.processing_error), ('failed', 'broken PNG chunk'))
+
+            # Строку удалили во время обработки: файл не остаётся в хранилище
+            NoteImage.objects.filter(pk=second.pk).delete()
+            self.assertFalse(process_image(second))
+            self.assertFalse(default_storage.exists(second.image.name))
+            self.assertEqual(len(rows), 2)
+
+    def test_bulk_moderation(self):
+        url = reverse('usernote-bulk-approve')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
+        response = self.client.post(url, {'ids': [self.note2_user2_pending.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token)
+        ids = [self.note2_user2_pending.id, self.note1_user1_approved.id, 999999]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(sum(q['sql'].lstrip().startswith('WITH matched') for q in queries.captured_queries), 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['results'], [
+            {'id': self.note2_user2_pending.id, 'result': 'approved'},
+            {'id': self.note1_user1_approved.id, 'result': 'skipped', 'status': 'approved'},
+            {'id': 999999, 'result': 'not_found'},
+        ])
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.notes_count, 2)
+
+        response = self.client.post(reverse('usernote-bulk-reject'), {
+            'ids': [self.note1_user1_approved.id, self.note2_user2_pending.id],
+            'from_status': ['approved'], 'rejection_reason': 'Спам',
+        }, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.note1_user1_approved.refresh_from_db()
+        self.assertEqual(self.note1_user1_approved.moderation_status, 'rejected')
+        self.assertEqual(self.note1_user1_approved.rejection_reason, 'Спам')
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.notes_count, 0)
+
+    def test_moderation_queue_leases(self):
+        other_moderator = User.objects.create_superuser('moderator2', 'moderator2@test.com', 'pass')
+        other_token = Token.objects.create(user=other_moderator).key
+        extra = UserNote.objects.create(place=self.place2, user=self.user3, text='Ещё на модерации', moderation_status='pending')
+        claim_url = reverse('usernote-queue-claim')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token)
+        response = self.client.post(claim_url, {'limit': 1}, format='json')
+        self.assertEqual([n['id'] for n in response.data['results']], [self.note2_user2_pending.id])
+        self.assertIsNotNone(response.data['lease_expires_at'])
+
+        # Второй модератор не получает уже выданный элемент
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + other_token)
+        response = self.client.post(claim_url, {'limit': 5}, format='json')
+        self.assertEqual([n['id'] for n in response.data['results']], [extra.id])
+
+        stats = self.client.get(reverse('usernote-queue-stats')).data
+        self.assertEqual((stats['depth'], stats['claimed'], stats['available']), (2, 2, 0))
+
+        # Чужую аренду продлить нельзя, свою — можно
+        response = self.client.post(reverse('usernote-queue-renew'), {'ids': [self.note2_user2_pending.id]}, format='json')
+        self.assertEqual(response.data['renewed'], [])
+
+        # Истёкшая аренда освобождается автоматически
+        UserNote.objects.filter(pk=self.note2_user2_pending.pk).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client.post(claim_url, {'limit': 5}, format='json')
+        self.assertEqual([n['id'] for n in response.data['results']], [self.note2_user2_pending.id, extra.id])
+
+        response = self.client.post(reverse('usernote-queue-release'), {'ids': [extra.id]}, format='json')
+        self.assertEqual(response.data['released'], 1)
+        self.client.patch(reverse('usernote-detail', args=[self.note2_user2_pending.id]) + 'approve/', format='json')
+        self.note2_user2_pending.refresh_from_db()
+        self.assertIsNone(self.note2_user2_pending.claimed_by)
+
+    def test_place_counters_follow_moderation(self):
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.notes_count, 1)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token)
+        response = self.client.patch(reverse('usernote-detail', args=[self.note2_user2_pending.id]) + 'approve/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.notes_count, 2)
+        self.assertIsNotNone(self.place.last_activity_at)
+
+        self.note1_user1_approved.delete()
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.notes_count, 1)
+
+        self.place.favorites.add(self.user1, self.user2)
+        self.user1.favorite_places.remove(self.place)
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.favorites_count, 1)
+
+    def test_notes_list_conditional_get(self):
+        params = {'place': self.place.id, 'moderation_status': 'approved'}
+        response = self.client.get(self.notes_list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.notes_list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.note1_user1_approved.text = 'Изменённая заметка.'
+        self.note1_user1_approved.save()
+        response = self.client.get(self.notes_list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Изображения не сдвигают updated_at заметки, но входят в ответ: ни добавление,
+        # ни обработка через update(), ни удаление не должны давать устаревший 304
+        etag = response['ETag']
+        image = NoteImage.objects.create(note=self.note1_user1_approved, image='', processing_status='pending')
+        response = self.client.get(self.notes_list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['images'][0]['processing_status'], 'pending')
+
+        etag = response['ETag']
+        # Файла в spool нет: обработка помечает изображение failed через update()
+        process_pending(NoteImage)
+        response = self.client.get(self.notes_list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['images'][0]['processing_status'], 'failed')
+
+        etag = response['ETag']
+        image.delete()
+        response = self.client.get(self.notes_list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['images'], [])
+
+    def test_place_retrieve_conditional_get(self):
+        url = reverse('place-detail', args=[self.place.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Новая одобренная заметка меняет notes_count, а вместе с ним и ETag
+        UserNote.objects.create(place=self.place, user=self.user2, text='Ещё одна.', moderation_status='approved')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_counter_changes_keep_places_version(self):
+        url = reverse('place-detail', args=[self.place.id])
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
+        list_etag = self.client.get(reverse('place-list'))['ETag']
+        self.client.credentials()
+        self.assertEqual(self.client.get(url).data['properties']['favorites_count'], 0)
+        version = get_places_version()
+
+        # Счётчики не сбрасывают тайлы, кластеры и кэш списков, но ответ по месту и ETag обновляются
+        self.place.favorites.add(self.user2)
+        UserNote.objects.create(place=self.place, user=self.user2, text='Ещё одна.', moderation_status='approved')
+        self.assertEqual(get_places_version(), version)
+        properties = self.client.get(url).data['properties']
+        self.assertEqual(properties['favorites_count'], 1)
+        self.assertEqual(properties['notes_count'], 2)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user1_token)
+        response = self.client.get(reverse('place-list'), HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_counters_do_not_go_below_zero(self):
+        # Рассинхронизация (гонка или каскад без m2m_changed): связь есть, а счётчик уже 0
+        self.place.favorites.add(self.user2)
+        Place.objects.filter(pk=self.place.pk).update(favorites_count=0, notes_count=0)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.user2_token)
+        response = self.client.post(reverse('place-toggle-favorite', args=[self.place.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.note1_user1_approved.delete()
+        self.place.refresh_from_db()
+        self.assertEqual((self.place.favorites_count, self.place.notes_count), (0, 0))
+
+    def test_recount_place_stats(self):
+        Place.objects.filter(pk=self.place.pk).update(notes_count=42, favorites_count=7)
+        call_command('recount_place_stats', stdout=open(os.devnull, 'w'))
+        self.place.refresh_from_db()
+        self.assertEqual(self.place.notes_count, 1)
+        self.assertEqual(self.place.favorites_count, 0)
 
     # Temporarily commented out due to AttributeError with 'owner'
     # def test_update_note_rating_changes_calculation(self):
@@ -309,7 +1054,7 @@ class CommentAPITest(APITestCase):
         )
         self.note = UserNote.objects.create(
             place=self.place, user=self.user1, text='Заметка для комментов.',
-            moderation_status='approved', rating=5
+            moderation_status='approved'
         )
 
         self.comment1_user1_approved = Comment.objects.create(
@@ -408,4 +1153,64 @@ class CommentAPITest(APITestCase):
     #     self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.admin_token)
     #     response = self.client.delete(reverse('comment-detail', args=[self.comment3_user2_rejected.id]))
     #     self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-    #     self.assertEqual(Comment.objects.count(), 3)
\ No newline at end of file
+    #     self.assertEqual(Comment.objects.count(), 3)
+
+class TokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('auth_user', 'auth@test.com', 'authpass')
+        self.token = Token.objects.create(user=self.user)
+        self.profile_url = reverse('profile')
+
+    def test_token_lookup_is_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        self.assertFalse(any('authtoken_token' in q['sql'] for q in queries.captured_queries))
+
+    def test_logout_evicts_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(reverse('logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_evicts_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_demotion_evicts_cached_token(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        url = reverse('place-bulk-approve')
+        # Пустой список ids — 400 после проверки прав; токен при этом уже в кэше
+        self.assertEqual(self.client.post(url, {'ids': []}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.is_staff = self.user.is_superuser = False
+        self.user.save()
+        self.assertEqual(self.client.post(url, {'ids': []}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(AUTH_TOKEN_EXPIRE_SECONDS=60)
+    def test_expired_token_rejected(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(minutes=5))
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_EXPIRE_SECONDS=60)
+    def test_login_replaces_expired_token(self):
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(minutes=5))
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Клиент ещё шлёт истёкший токен, вход всё равно проходит и выдаёт новый ключ
+        response = self.client.post(reverse('login'), {'username': 'auth_user', 'password': 'authpass'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['token'], self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + response.data['token'])
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,166 @@
+"""
+Бенчмарк горячих эндпоинтов: p50/p95 задержки, число SQL-запросов и пик памяти
+сравниваются с бюджетами из benchmark_budgets.json; превышение роняет прогон.
+
+Запускается только явно, чтобы не замедлять обычные тесты:
+
+    PLACES_BENCHMARK=1 python manage.py test places.tests.test_benchmarks
+
+PLACES_BENCHMARK_SCALE — число мест в наборе (по умолчанию из бюджетов),
+PLACES_BENCHMARK_OUTPUT — путь JSON-файла с результатами (по умолчанию вывод в stdout).
+Бюджеты задержек заданы для масштаба из файла; при другом масштабе проверяются только запросы.
+"""
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import unittest
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from places.api.cache import bump_places_version
+from places.models import Place
+from places.synthetic import SyntheticDataGenerator
+
+User = get_user_model()
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_budgets.json')
+with open(BUDGETS_PATH, encoding='utf-8') as budgets_file:
+    BUDGETS = json.load(budgets_file)
+
+BENCHMARK_ENABLED = os.environ.get('PLACES_BENCHMARK') == '1'
+SCALE = int(os.environ.get('PLACES_BENCHMARK_SCALE', BUDGETS['scale']))
+# Центр набора, вокруг него же ищем ближайшие места
+CENTER = (55.7963, 49.1088)
+
+
+def percentile(values, p):
+    """
+    Перцентиль по ближайшему рангу; values не пуст.
+    """
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * p / 100)) - 1]
+
+
+@unittest.skipUnless(BENCHMARK_ENABLED, 'set PLACES_BENCHMARK=1 to run endpoint benchmarks')
+class EndpointBenchmarkTest(APITestCase):
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticDataGenerator(
+            SCALE, seed=BUDGETS['seed'], centers=[(*CENTER, 1)], image_ratio=0, chunk_size=5000,
+        ).run()
+        call_command('recount_place_stats', stdout=StringIO())
+        bump_places_version()
+        cls.user = User.objects.create_user('benchmark_user', 'benchmark@test.com', 'benchmarkpass')
+        cls.token = Token.objects.create(user=cls.user).key
+        # Самое «тяжёлое» место: больше всего заметок и комментариев
+        cls.place = Place.objects.filter(status='approved').order_by('-notes_count', '-comments_count', 'id').first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.results:
+            return
+        report = json.dumps({
+            'timestamp': timezone.now().isoformat(),
+            'scale': SCALE,
+            'iterations': BUDGETS['iterations'],
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'endpoints': cls.results,
+        }, indent=2, sort_keys=True)
+        output = os.environ.get('PLACES_BENCHMARK_OUTPUT')
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                f.write(report + '\n')
+        else:
+            sys.stdout.write(report + '\n')
+
+    def setUp(self):
+        # Авторизованные запросы обходят кэш анонимных ответов: меряем реальную работу
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+
+    def _request(self, method, url, data=None):
+        response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, response.content[:500])
+        # Потоковые и ленивые ответы дочитываем, чтобы рендеринг попал в замер
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def benchmark(self, name, method, url, data=None):
+        budget = BUDGETS['endpoints'][name]
+        for _ in range(BUDGETS['warmup']):
+            self._request(method, url, data)
+
+        timings, queries = [], 0
+        for _ in range(BUDGETS['iterations']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self._request(method, url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+
+        # Память меряется отдельным вызовом: tracemalloc заметно замедляет запрос
+        tracemalloc.start()
+        try:
+            self._request(method, url, data)
+            peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': queries,
+            'peak_memory_kb': round(peak_kb, 1),
+            'budget': budget,
+        }
+        self.results[name] = result
+
+        exceeded = []
+        if queries > budget['max_queries']:
+            exceeded.append(f"queries {queries} > {budget['max_queries']}")
+        if SCALE == BUDGETS['scale']:
+            for key in ('p50_ms', 'p95_ms', 'peak_memory_kb'):
+                if result[key] > budget[key]:
+                    exceeded.append(f'{key} {result[key]} > {budget[key]}')
+        self.assertFalse(exceeded, f"{name} over budget: {', '.join(exceeded)}")
+
+    def test_place_list(self):
+        self.benchmark('place-list', 'get', reverse('place-list'))
+
+    def test_place_retrieve(self):
+        self.benchmark('place-retrieve', 'get', reverse('place-detail', args=[self.place.pk]))
+
+    def test_place_nearest(self):
+        url = reverse('place-nearest') + f'?lat={CENTER[0]}&lon={CENTER[1]}&radius_km=5'
+        self.benchmark('place-nearest', 'get', url)
+
+    def test_place_nearest_knn(self):
+        url = reverse('place-nearest') + f'?lat={CENTER[0]}&lon={CENTER[1]}&k=20'
+        self.benchmark('place-nearest-knn', 'get', url)
+
+    def test_place_toggle_favorite(self):
+        # Вызовы чередуют добавление и удаление, в бюджет идёт худший по запросам
+        self.benchmark('place-toggle-favorite', 'post', reverse('place-toggle-favorite', args=[self.place.pk]))
+
+    def test_note_list_by_place(self):
+        self.benchmark('usernote-list-by-place', 'get', reverse('usernote-list') + f'?place={self.place.pk}')
+
+    def test_comment_list_by_place(self):
+        self.benchmark('comment-list-by-place', 'get', reverse('comment-list') + f'?place={self.place.pk}')
@@ -0,0 +1,109 @@
+# backend/users/authentication.py
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenUserCache:
+    """
+    LRU-кэш token -> (user, token.created) в памяти процесса с ограниченным временем жизни записи.
+    """
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, user, created):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {'user': user, 'created': created, 'cached_at': now, 'expires_at': now + self.timeout}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenUserCache(
+    max_entries=getattr(settings, 'AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000),
+    timeout=getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300),
+)
+
+
+def _revoked_key(key):
+    return 'auth:token-revoked:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def revoke_token(key):
+    """
+    Сбрасывает закэшированную запись токена. Отметка в общем кэше нужна, чтобы
+    запись сбросили и остальные процессы, а не только текущий.
+    """
+    token_cache.delete(key)
+    cache.set(_revoked_key(key), time.time(), token_cache.timeout)
+
+
+def is_token_expired(created):
+    expire_seconds = getattr(settings, 'AUTH_TOKEN_EXPIRE_SECONDS', 0)
+    return bool(expire_seconds) and created + timedelta(seconds=expire_seconds) < timezone.now()
+
+
+def revoke_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        revoke_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса Token + User на каждый вызов: результат кэшируется
+    на AUTH_TOKEN_CACHE_TIMEOUT секунд. При AUTH_TOKEN_EXPIRE_SECONDS > 0 токены старше
+    этого срока отклоняются.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            revoked_at = cache.get(_revoked_key(key))
+            if revoked_at is None or revoked_at < entry['cached_at']:
+                self.check_expiry(entry['created'])
+                # Копия, чтобы данные одного запроса (например, роли) не попадали в другие
+                user = copy.copy(entry['user'])
+                return (user, Token(key=key, user=user, created=entry['created']))
+            token_cache.delete(key)
+
+        user, token = super().authenticate_credentials(key)
+        self.check_expiry(token.created)
+        token_cache.set(key, copy.copy(user), token.created)
+        return (user, token)
+
+    def check_expiry(self, created):
+        if is_token_expired(created):
+            raise exceptions.AuthenticationFailed('Token has expired.')
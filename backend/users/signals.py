@@ -0,0 +1,30 @@
+# backend/users/signals.py
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import revoke_token, revoke_user_tokens
+
+User = get_user_model()
+
+# Поля пользователя, которые закэшированный в CachedTokenAuthentication объект не должен пережить
+AUTH_STATE_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
+@receiver(post_delete, sender=Token)
+def token_post_delete(sender, instance, **kwargs):
+    # Выход (LogoutView.post) и удаление токена в админке
+    revoke_token(instance.key)
+
+@receiver(post_init, sender=User)
+def remember_auth_state(sender, instance, **kwargs):
+    state = instance.__dict__
+    instance._auth_state = tuple(state.get(field) for field in AUTH_STATE_FIELDS)
+
+@receiver(post_save, sender=User)
+def user_post_save(sender, instance, created, **kwargs):
+    # Деактивация, смена пароля или снятие прав должны сразу сбросить закэшированные токены
+    auth_state = tuple(getattr(instance, field) for field in AUTH_STATE_FIELDS)
+    if not created and auth_state != instance._auth_state:
+        revoke_user_tokens(instance.pk)
+    instance._auth_state = auth_state
@@ -6,6 +6,7 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from django.contrib.auth.models import User
+from .authentication import is_token_expired
 from .serializers import UserSerializer, AuthTokenSerializer
 
 class RegisterView(generics.CreateAPIView):
@@ -35,12 +36,18 @@ class RegisterView(generics.CreateAPIView):
 
 class LoginView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
+    # Вход не зависит от заголовка Authorization: клиент может прислать истёкший токен
+    authentication_classes = ()
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         token, created = Token.objects.get_or_create(user=user)
+        if not created and is_token_expired(token.created):
+            # Иначе повторный вход вернул бы тот же истёкший ключ; удаление отзывает его через post_delete
+            token.delete()
+            token = Token.objects.create(user=user)
         print(f"Login successful for {user.username}, token: {token.key}")  # Для отладки
         return Response({
             'token': token.key,